@@ -2,16 +2,48 @@ from __future__ import annotations
 
 import json
 import os
+import threading
+import time
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from tkinter import ttk
 
-from clipboard import get_clipboard_text, set_clipboard_text
-from hotkeys import HotkeyManager, send_ctrl_v_best_effort, to_pynput_combo
-from storage import Config, load_config, load_history, make_entry, save_config, save_history
+from capture import Capture, CapturePipeline
+from clipboard import (
+    RICH_TARGETS,
+    get_clipboard_target,
+    get_clipboard_text,
+    hand_off_clipboard,
+    list_clipboard_targets,
+    set_clipboard_formats,
+    set_clipboard_text,
+    sync_tk_clipboard,
+    use_tk_backend,
+)
+from cliptrace import TraceRecorder
+from history import Batch, BatchResult, History, date_buckets, entry_hash, format_bytes, time_ranges
+from hotkeys import HotkeyManager, paste_injector, send_ctrl_v_best_effort, to_pynput_combo
+from profiling import DEFAULT_SECONDS, Profiler
+from search import SearchController, remove_stale_corpora
+from storage import (
+    TIME_FORMAT,
+    Config,
+    clean_entry,
+    load_config,
+    load_history,
+    profiles_dir,
+    save_config,
+    save_history,
+    stall_log_path,
+    trace_path,
+    unpack_history,
+)
+from stallwatch import StallWatchdog
+from transforms import PRESET_LABELS, PRESETS, TransformEngine
 
 
 class Copy2App(ttk.Frame):
@@ -20,7 +52,12 @@ class Copy2App(ttk.Frame):
         self.master = master
 
         self.cfg: Config = load_config()
-        self.history: List[Dict[str, str]] = load_history(self.cfg.max_history)
+        self.history = History(
+            max_items=self.cfg.max_history,
+            max_bytes=self.cfg.max_history_mb * 1024 * 1024,
+            entries=load_history(self.cfg.max_history),
+        )
+        self.history.enforce(self.cfg.favorites)
 
         # UI state
         self.paused = tk.BooleanVar(value=False)
@@ -28,13 +65,31 @@ class Copy2App(ttk.Frame):
         self.enable_hotkeys = tk.BooleanVar(value=self.cfg.enable_hotkeys)
         self.send_paste = tk.BooleanVar(value=self.cfg.send_paste)
         self.search_var = tk.StringVar(value="")
+        self.when_var = tk.StringVar(value="All")
         self.status_var = tk.StringVar(value="Ready")
 
+        # Visible row -> history index; date header rows map to -1
         self._filtered_indexes: List[int] = list(range(len(self.history)))
-        self._last_clipboard_text: Optional[str] = None
-        self._ignore_clipboard_once = False
+        self._capture = CapturePipeline(
+            history=self.history,
+            favorites=lambda: self.cfg.favorites,
+            persist=self._persist_history,
+        )
+        self._set_trace_recording(self.cfg.record_trace or bool(os.environ.get("COPY2_TRACE")))
 
         self._hotkeys: Optional[HotkeyManager] = None
+        # Cycle presses arrive on the hotkey thread and are coalesced into one Tk callback
+        self._cycle_lock = threading.Lock()
+        self._pending_cycle = 0
+        self._cycle_started: Optional[float] = None
+
+        self._transforms = TransformEngine(schedule=lambda cb: self.master.after(0, cb))
+        self._search = SearchController(schedule=lambda cb: self.master.after(0, cb))
+        self._search_after_id: Optional[str] = None
+        # Near-duplicate groups the user unfolded in the history list
+        self._expanded_groups: set = set()
+        # group -> its members among the rows being shown (oldest first), set by _collapse_groups
+        self._shown_groups: Dict[str, List[Dict[str, Any]]] = {}
 
         self._build_ui()
         self._refresh_lists()
@@ -55,7 +110,16 @@ class Copy2App(ttk.Frame):
         ttk.Label(toolbar, text="Search:").pack(side="left", padx=(20, 6))
         self.search_entry = ttk.Entry(toolbar, textvariable=self.search_var, width=34)
         self.search_entry.pack(side="left")
-        self.search_entry.bind("<KeyRelease>", lambda _e: self._refresh_lists())
+        # Only real edits trigger a search (not arrows/modifiers), debounced while typing
+        self.search_var.trace_add("write", lambda *_a: self._schedule_search())
+        self.search_entry.bind("<Return>", lambda _e: self._apply_search())
+
+        ttk.Label(toolbar, text="When:").pack(side="left", padx=(12, 6))
+        when = ttk.Combobox(
+            toolbar, textvariable=self.when_var, values=["All", *time_ranges()], width=11, state="readonly"
+        )
+        when.pack(side="left")
+        when.bind("<<ComboboxSelected>>", lambda _e: self._apply_search())
 
         ttk.Button(toolbar, text="Settings", command=self._open_settings).pack(side="right")
         ttk.Button(toolbar, text="Help", command=self._show_help).pack(side="right", padx=(0, 8))
@@ -97,6 +161,8 @@ class Copy2App(ttk.Frame):
         self.history_list.pack(side="left", fill="y")
         sb.pack(side="right", fill="y")
         self.history_list.bind("<<ListboxSelect>>", lambda _e: self._update_preview(from_favorites=False))
+        self.history_list.bind("<Double-Button-1>", lambda _e: self._toggle_group())
+        self.history_list.bind("<Delete>", lambda _e: self._delete_selected())
 
         # Buttons
         btns = ttk.Frame(left)
@@ -104,9 +170,24 @@ class Copy2App(ttk.Frame):
 
         ttk.Button(btns, text="Copy", command=self._copy_selected).pack(fill="x")
         ttk.Button(btns, text="Reverse lines", command=self._reverse_selected).pack(fill="x", pady=(6, 0))
+        transform_btn = ttk.Menubutton(btns, text="Transform…")
+        transform_menu = tk.Menu(transform_btn, tearoff=False)
+        for preset, label in PRESET_LABELS.items():
+            transform_menu.add_command(label=label, command=lambda p=preset: self._transform_selected(p))
+        transform_btn["menu"] = transform_menu
+        transform_btn.pack(fill="x", pady=(6, 0))
         ttk.Button(btns, text="Paste (best effort)", command=lambda: self._paste_selected(best_effort=True)).pack(fill="x", pady=(6, 0))
         ttk.Button(btns, text="Add to favorites", command=self._add_selected_to_favorites).pack(fill="x", pady=(6, 0))
         ttk.Button(btns, text="Combine selected", command=self._combine_selected).pack(fill="x", pady=(6, 0))
+        selection_btn = ttk.Menubutton(btns, text="Selected items…")
+        selection_menu = tk.Menu(selection_btn, tearoff=False)
+        selection_menu.add_command(label="Delete", command=self._delete_selected)
+        selection_menu.add_command(label="Add to favorites", command=self._add_selected_to_favorites)
+        selection_menu.add_command(label="Remove from favorites", command=self._unfavorite_selected)
+        selection_menu.add_command(label="Move to newest", command=self._move_selected_to_front)
+        selection_menu.add_command(label="Export…", command=self._export_selected)
+        selection_btn["menu"] = selection_menu
+        selection_btn.pack(fill="x", pady=(6, 0))
         ttk.Button(btns, text="Clear history", command=self._clear_history).pack(fill="x", pady=(6, 0))
 
         # Preview
@@ -146,13 +227,37 @@ class Copy2App(ttk.Frame):
 
     # ---------------- Core behavior ----------------
     def _start_services(self) -> None:
+        # Serve and read the clipboard from our own Tk interpreter; helpers remain the fallback
+        use_tk_backend(self.master)
+
         # Seed last clipboard value to avoid immediate duplication
-        txt, _err = get_clipboard_text()
-        self._last_clipboard_text = txt
+        self._capture.seed()
+
+        # Search corpora of instances that were killed or crashed would sit in /dev/shm until reboot
+        remove_stale_corpora()
 
         # Clipboard polling
         self.after(self.cfg.poll_interval_ms, self._poll_clipboard)
 
+        self._watchdog = StallWatchdog(
+            schedule=self.after, log_path=stall_log_path(), threshold_ms=self.cfg.stall_threshold_ms
+        )
+        self._watchdog.start()
+
+        # Field profiling: Settings button, COPY2_PROFILE=<seconds>, or SIGUSR1/SIGUSR2
+        self._profiler = Profiler(
+            out_dir=profiles_dir(),
+            schedule=self.after,
+            stats=lambda: {"history_items": len(self.history), "history_bytes": self.history.total_bytes},
+        )
+        self._profiler.install_signal_handlers(
+            on_done=self._on_profile_written,
+            on_armed=lambda: self._set_status("Tracing memory; send SIGUSR2 again for a report"),
+        )
+        seconds = os.environ.get("COPY2_PROFILE")
+        if seconds:
+            self._start_profile(int(seconds) if seconds.isdigit() else DEFAULT_SECONDS)
+
         # Hotkeys (optional)
         if self.enable_hotkeys.get():
             self._start_hotkeys()
@@ -160,34 +265,84 @@ class Copy2App(ttk.Frame):
     def _poll_clipboard(self) -> None:
         try:
             if not self.paused.get():
-                txt, err = get_clipboard_text()
+                capture, err = self._capture.poll()
                 if err:
                     # show once every few seconds? keep simple
                     self._set_status("Clipboard backend missing. Open Settings > Help for install hints.")
-                else:
-                    if isinstance(txt, str):
-                        if self._ignore_clipboard_once:
-                            self._ignore_clipboard_once = False
-                            self._last_clipboard_text = txt
-                        elif txt and txt.strip() and txt != self._last_clipboard_text:
-                            self._last_clipboard_text = txt
-                            self._add_history_entry(txt)
+                elif capture is not None:
+                    self._on_capture(capture)
         finally:
             self.after(self.cfg.poll_interval_ms, self._poll_clipboard)
 
-    def _add_history_entry(self, text: str) -> None:
-        if self.history and text == self.history[-1].get("text"):
+    def _persist_history(self, entries: List[Dict[str, Any]]) -> None:
+        if not self.session_only.get():
+            save_history(entries)
+
+    def _start_profile(self, seconds: int = DEFAULT_SECONDS) -> None:
+        err = self._profiler.start(seconds, on_done=self._on_profile_written)
+        if err:
+            self._set_status(err)
             return
+        self._set_status(f"Profiling for {seconds} s…")
 
-        self.history.append(make_entry(text))
-        if len(self.history) > self.cfg.max_history:
-            self.history = self.history[-self.cfg.max_history :]
+    def _on_profile_written(self, paths: List[Path]) -> None:
+        if paths:
+            self._set_status(f"Profile written to {paths[0].parent}")
 
-        if not self.session_only.get():
-            save_history(self.history)
+    def _set_trace_recording(self, on: bool) -> None:
+        if self._capture.recorder is not None:
+            self._capture.recorder.close()
+        self._capture.recorder = TraceRecorder(trace_path()) if on else None
 
+    def _on_capture(self, capture: Capture) -> None:
+        entry = capture.entry
         self._refresh_lists()
-        self._set_status(f"Captured clipboard ({len(text)} chars)")
+        if capture.kind == "too_large":
+            self._set_status(f"Clip too large for the history budget ({len(entry['text'])} chars)")
+            return
+        if capture.kind == "moved":
+            # Seen before: brought back to the top instead of storing another copy
+            self._set_status(f"Moved to top (captured {entry['uses']} times)")
+            if entry.get("formats"):
+                return
+        else:
+            self._set_status(f"Captured clipboard ({len(entry['text'])} chars)")
+        self._capture_rich_formats(entry)
+
+    def _capture_rich_formats(self, entry: Dict[str, Any]) -> None:
+        """Record the clipboard targets for a fresh capture and fetch rich ones off the Tk thread.
+
+        The poll path only ever reads plain text; everything else happens here, once per capture.
+        """
+
+        def work() -> None:
+            targets, _err = list_clipboard_targets()
+            formats: Dict[str, str] = {}
+            for target in RICH_TARGETS:
+                if target in targets:
+                    data, _err = get_clipboard_target(target)
+                    if data:
+                        formats[target] = data
+            try:
+                self.master.after(0, lambda: self._apply_rich_formats(entry, targets, formats))
+            except Exception:
+                # Window already gone
+                pass
+
+        threading.Thread(target=work, name="copy2-targets", daemon=True).start()
+
+    def _apply_rich_formats(self, entry: Dict[str, Any], targets: List[str], formats: Dict[str, str]) -> None:
+        # The clipboard may have moved on while we were fetching; don't attach someone else's formats.
+        if entry["text"] != self._capture.last_text or not self.history.contains(entry):
+            return
+        if targets:
+            entry["targets"] = targets
+        if formats:
+            entry["formats"] = formats
+            self.history.refresh_size(entry)
+            if self.history.enforce(self.cfg.favorites):
+                self._refresh_lists()
+            self._persist_history(self.history.entries)
 
     # ---------------- Selection helpers ----------------
     def _get_selected_history_indexes(self) -> List[int]:
@@ -197,16 +352,20 @@ class Copy2App(ttk.Frame):
         # map visible list index -> actual history index
         actual = []
         for i in sel:
-            if 0 <= i < len(self._filtered_indexes):
+            if 0 <= i < len(self._filtered_indexes) and self._filtered_indexes[i] >= 0:
                 actual.append(self._filtered_indexes[i])
         return actual
 
-    def _get_selected_history_text(self) -> Optional[str]:
+    def _get_selected_history_entry(self) -> Optional[Dict[str, Any]]:
         idxs = self._get_selected_history_indexes()
         if not idxs:
             return None
         # If multiple selected, use the first for actions like copy/reverse
-        return self.history[idxs[0]]["text"]
+        return self.history[idxs[0]]
+
+    def _get_selected_history_text(self) -> Optional[str]:
+        entry = self._get_selected_history_entry()
+        return entry["text"] if entry else None
 
     def _get_selected_fav_index(self) -> Optional[int]:
         sel = list(self.favs_list.curselection())
@@ -215,20 +374,54 @@ class Copy2App(ttk.Frame):
         return sel[0]
 
     # ---------------- Actions (History) ----------------
+    def _write_entry_to_clipboard(self, entry: Dict[str, Any]) -> Optional[str]:
+        formats = entry.get("formats") or {}
+        if formats:
+            err = set_clipboard_formats(entry["text"], formats)
+        else:
+            err = set_clipboard_text(entry["text"])
+        self._capture.ignore_once = True
+        return err
+
+    def _await_clipboard(self, text: str, timeout_s: float = 0.25) -> bool:
+        """Wait until other clients see `text` on the clipboard, so a paste can't hit the old owner.
+
+        When Tk owns the selection, a server round trip flushes the ownership change
+        (pynput sends Ctrl+V on its own X connection). Otherwise the helpers read the
+        clipboard back; each such read goes to the current owner, so no sleeps are
+        needed between tries.
+        """
+        if sync_tk_clipboard(text):
+            return True
+        deadline = time.perf_counter() + timeout_s
+        while True:
+            current, err = get_clipboard_text()
+            if err:
+                # Without a readable backend there is nothing to wait for
+                return True
+            if current == text:
+                return True
+            if time.perf_counter() >= deadline:
+                return False
+
     def _copy_selected(self) -> None:
-        text = self._get_selected_history_text()
-        if not text:
+        entry = self._get_selected_history_entry()
+        if not entry or not entry["text"]:
             self._set_status("No history item selected")
             return
-        err = set_clipboard_text(text)
-        self._ignore_clipboard_once = True
+        err = self._write_entry_to_clipboard(entry)
         if err:
             messagebox.showerror("Clipboard error", err)
             return
         self._set_status("Copied to clipboard")
 
     def _reverse_selected(self) -> None:
-        text = self._get_selected_history_text()
+        self._transform_selected("reverse_lines")
+
+    def _transform_selected(self, preset: str) -> None:
+        entry = self._get_selected_history_entry()
+        text = entry["text"] if entry else None
+        digest = entry_hash(entry) if text else None
         if not text:
             # fall back to current clipboard
             text, err = get_clipboard_text()
@@ -236,16 +429,23 @@ class Copy2App(ttk.Frame):
                 messagebox.showerror("Clipboard error", err)
                 return
         if not text:
-            self._set_status("Nothing to reverse")
+            self._set_status("Nothing to transform")
             return
-        lines = str(text).splitlines()
-        reversed_text = "\n".join(reversed(lines))
-        err = set_clipboard_text(reversed_text)
-        self._ignore_clipboard_once = True
-        if err:
-            messagebox.showerror("Clipboard error", err)
-            return
-        self._set_status("Reversed lines copied to clipboard")
+        label = PRESET_LABELS.get(preset, preset)
+
+        def done(out: str) -> None:
+            err = set_clipboard_text(out)
+            self._capture.ignore_once = True
+            if err:
+                messagebox.showerror("Clipboard error", err)
+                return
+            self._set_status(f"{label}: copied to clipboard")
+
+        def failed(msg: str) -> None:
+            messagebox.showerror("Transform error", msg)
+
+        if not self._transforms.run(str(text), PRESETS[preset], done, failed, digest):
+            self._set_status(f"{label}: working…")
 
     def _paste_selected(self, best_effort: bool = False) -> None:
         self._copy_selected()
@@ -261,33 +461,131 @@ class Copy2App(ttk.Frame):
             return
         combined = "\n".join(self.history[i]["text"] for i in idxs)
         err = set_clipboard_text(combined)
-        self._ignore_clipboard_once = True
+        self._capture.ignore_once = True
         if err:
             messagebox.showerror("Clipboard error", err)
             return
         self._set_status(f"Combined {len(idxs)} items copied to clipboard")
 
+    # ---------------- Actions (Selection) ----------------
+    def _get_selected_history_entries(self) -> List[Dict[str, Any]]:
+        return [self.history[i] for i in self._get_selected_history_indexes()]
+
+    def _apply_batch(self, batch: Batch) -> BatchResult:
+        """Apply a batch, then write each changed file once and redraw once."""
+        before = list(self.history.entries)
+        result = self.history.apply_batch(batch, self.cfg.favorites)
+        if result.history_changed:
+            self._persist_history(self.history.entries)
+        if result.favorites_changed:
+            self.cfg.favorites = result.favorites
+            save_config(self.cfg)
+
+        if result.moved or (result.removed and not self._drop_history_rows(before, result.removed)):
+            self._refresh_lists()
+        elif result.favorites_changed:
+            self._refresh_favorites()
+        return result
+
+    def _drop_history_rows(self, before: List[Dict[str, Any]], removed: List[Dict[str, Any]]) -> bool:
+        """Delete only the removed entries' rows; False if the list needs a full redraw instead."""
+        self._search.invalidate()
+        if self.search_var.get().strip():
+            # A search may still be streaming rows that index the old history
+            return False
+        if any(len(self._shown_groups.get(e.get("group", ""), ())) > 1 for e in removed):
+            # A surviving group member's "+N similar" row changes
+            return False
+
+        gone = {id(e) for e in removed}
+        pos = {id(e): i for i, e in enumerate(self.history)}
+        drop: List[int] = []
+        kept: List[Tuple[int, int]] = []
+        for row, i in enumerate(self._filtered_indexes):
+            if i >= 0 and id(before[i]) in gone:
+                drop.append(row)
+            else:
+                kept.append((row, -1 if i < 0 else pos[id(before[i])]))
+        # Date headers left with nothing under them go too
+        indexes: List[int] = []
+        for k, (row, i) in enumerate(kept):
+            if i < 0 and (k + 1 == len(kept) or kept[k + 1][1] < 0):
+                drop.append(row)
+            else:
+                indexes.append(i)
+
+        # Delete bottom-up in contiguous runs so earlier row numbers stay valid
+        drop.sort(reverse=True)
+        k = 0
+        while k < len(drop):
+            last = first = drop[k]
+            while k + 1 < len(drop) and drop[k + 1] == first - 1:
+                k += 1
+                first = drop[k]
+            self.history_list.delete(first, last)
+            k += 1
+        self._filtered_indexes = indexes
+        self._update_preview(from_favorites=False)
+        return True
+
+    def _delete_selected(self) -> None:
+        entries = self._get_selected_history_entries()
+        if not entries:
+            self._set_status("No history item selected")
+            return
+        if len(entries) > 1 and not messagebox.askyesno("Delete", f"Delete {len(entries)} items from history?"):
+            return
+        result = self._apply_batch(Batch(delete=entries))
+        self._set_status(f"Deleted {len(result.removed)} item(s)")
+
     def _add_selected_to_favorites(self) -> None:
-        text = self._get_selected_history_text()
-        if not text:
+        entries = self._get_selected_history_entries()
+        if not entries:
             self._set_status("No history item selected")
             return
-        if text in self.cfg.favorites:
+        count = len(self.cfg.favorites)
+        result = self._apply_batch(Batch(favorite=entries))
+        if not result.favorites_changed:
             self._set_status("Already in favorites")
             return
-        self.cfg.favorites.append(text)
-        save_config(self.cfg)
-        self._refresh_lists()
-        self._set_status("Added to favorites")
+        added = len(result.favorites) - count
+        self._set_status("Added to favorites" if added == 1 else f"Added {added} items to favorites")
+
+    def _unfavorite_selected(self) -> None:
+        entries = self._get_selected_history_entries()
+        if not entries:
+            self._set_status("No history item selected")
+            return
+        count = len(self.cfg.favorites)
+        result = self._apply_batch(Batch(unfavorite=entries))
+        if not result.favorites_changed:
+            self._set_status("Not in favorites")
+            return
+        self._set_status(f"Removed {count - len(result.favorites)} item(s) from favorites")
+
+    def _move_selected_to_front(self) -> None:
+        entries = self._get_selected_history_entries()
+        if not entries:
+            self._set_status("No history item selected")
+            return
+        result = self._apply_batch(Batch(move_to_front=entries, time_str=datetime.now().strftime(TIME_FORMAT)))
+        self._set_status(f"Moved {len(result.moved)} item(s) to newest")
+
+    def _export_selected(self) -> None:
+        entries = self._get_selected_history_entries()
+        if not entries:
+            self._set_status("No history item selected")
+            return
+        self._export_entries(self._apply_batch(Batch(export=entries)).exported, "Export selected items")
 
     def _clear_history(self) -> None:
         if not self.history:
             return
         if not messagebox.askyesno("Clear history", "Clear clipboard history?"):
             return
-        self.history = []
+        self.history.clear()
         if not self.session_only.get():
-            save_history(self.history)
+            save_history(self.history.entries)
         self._refresh_lists()
         self._set_status("History cleared")
 
@@ -295,15 +593,18 @@ class Copy2App(ttk.Frame):
         if not self.history:
             self._set_status("Nothing to export")
             return
+        self._export_entries(self.history.entries, "Export history")
+
+    def _export_entries(self, entries: List[Dict[str, Any]], title: str) -> None:
         path = filedialog.asksaveasfilename(
-            title="Export history",
+            title=title,
             defaultextension=".json",
             filetypes=[("JSON", "*.json")],
         )
         if not path:
             return
-        Path(path).write_text(json.dumps(self.history, ensure_ascii=False, indent=2), encoding="utf-8")
-        self._set_status(f"Exported to {path}")
+        Path(path).write_text(json.dumps(entries, ensure_ascii=False, indent=2), encoding="utf-8")
+        self._set_status(f"Exported {len(entries)} items to {path}")
 
     def _import_history(self) -> None:
         path = filedialog.askopenfilename(
@@ -320,13 +621,15 @@ class Copy2App(ttk.Frame):
         if not isinstance(items, list):
             messagebox.showerror("Import error", "Invalid history file")
             return
-        cleaned: List[Dict[str, str]] = []
-        for it in items:
-            if isinstance(it, dict) and isinstance(it.get("text"), str):
-                cleaned.append({"time": str(it.get("time", "")) or "", "text": it["text"]})
-        self.history = cleaned[-self.cfg.max_history :]
+        cleaned: List[Dict[str, Any]] = []
+        # A history.json from another install stores near-duplicates as deltas
+        for it in unpack_history(items):
+            entry = clean_entry(it)
+            if entry is not None:
+                cleaned.append(entry)
+        self.history.replace(cleaned, self.cfg.favorites)
         if not self.session_only.get():
-            save_history(self.history)
+            save_history(self.history.entries)
         self._refresh_lists()
         self._set_status(f"Imported {len(self.history)} items")
 
@@ -338,7 +641,7 @@ class Copy2App(ttk.Frame):
             return
         text = self.cfg.favorites[idx]
         err = set_clipboard_text(text)
-        self._ignore_clipboard_once = True
+        self._capture.ignore_once = True
         if err:
             messagebox.showerror("Clipboard error", err)
             return
@@ -365,33 +668,114 @@ class Copy2App(ttk.Frame):
 
     # ---------------- Preview & filtering ----------------
     def _refresh_lists(self) -> None:
-        term = self.search_var.get().strip().lower()
-        if term:
-            self._filtered_indexes = [i for i, e in enumerate(self.history) if term in e["text"].lower()]
-        else:
-            self._filtered_indexes = list(range(len(self.history)))
+        # History changed: previous search results can't be narrowed any more
+        self._search.invalidate()
+        self._refresh_favorites()
+        self._apply_search()
 
-        # History list
-        self.history_list.delete(0, tk.END)
-        for i in self._filtered_indexes:
-            e = self.history[i]
-            ts = (e.get("time") or "").split(" ")[-1][:8]
-            snippet = e["text"].replace("\n", "\\n")
-            if len(snippet) > 64:
-                snippet = snippet[:64] + "…"
-            self.history_list.insert(tk.END, f"{ts} | {snippet}")
-
-        # Favorites list
+    def _refresh_favorites(self) -> None:
         self.favs_list.delete(0, tk.END)
         for f in self.cfg.favorites:
             snippet = f.replace("\n", "\\n")
             if len(snippet) > 64:
                 snippet = snippet[:64] + "…"
             self.favs_list.insert(tk.END, snippet)
-
-        self._update_preview(from_favorites=False)
         self._update_preview(from_favorites=True)
 
+    def _schedule_search(self, delay_ms: int = 120) -> None:
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(delay_ms, self._apply_search)
+
+    def _apply_search(self) -> None:
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+            self._search_after_id = None
+        window = None
+        span = time_ranges().get(self.when_var.get())
+        if span is not None:
+            # Entries are time-ordered, so a range is two bisects
+            window = self.history.range_indexes(*span)
+        self._search.search(self.history, self.search_var.get(), self._on_search_results, window)
+
+    def _on_search_results(self, batch: List[int], reset: bool, done: bool) -> None:
+        # Plain browsing folds near-duplicates behind their newest member; search shows every match
+        grouped = reset and done and not self.search_var.get().strip()
+        if grouped:
+            batch = self._collapse_groups(batch)
+        elif reset:
+            self._shown_groups = {}
+        if reset:
+            self._filtered_indexes = []
+            self.history_list.delete(0, tk.END)
+
+        # History list; a complete result set gets date headers
+        rows: List[str] = []
+        headers: List[int] = []
+        buckets = date_buckets() if reset and done else []
+        b = 0
+        start = len(self._filtered_indexes)
+        for i in batch:
+            ts = self.history[i].get("ts", 0.0)
+            if b < len(buckets) and ts >= buckets[b][1]:
+                while b + 1 < len(buckets) and ts >= buckets[b + 1][1]:
+                    b += 1
+                headers.append(start + len(rows))
+                rows.append(f"— {buckets[b][0]} —")
+                self._filtered_indexes.append(-1)
+                b += 1
+            rows.append(self._history_row(i, grouped))
+            self._filtered_indexes.append(i)
+        if rows:
+            self.history_list.insert(tk.END, *rows)
+            for r in headers:
+                self.history_list.itemconfigure(r, foreground="gray")
+
+        if reset:
+            self._update_preview(from_favorites=False)
+
+    def _collapse_groups(self, indexes: List[int]) -> List[int]:
+        # Only members inside `indexes` count: with a "When" window, a group's newest
+        # member in the window heads it, even if newer siblings fall outside
+        self._shown_groups = {}
+        for i in indexes:
+            e = self.history[i]
+            self._shown_groups.setdefault(e.get("group", ""), []).append(e)
+        # An expanded group's older members keep their own (time-ordered) rows, so they
+        # stay under the right date header; the "↳" marks them as members
+        out: List[int] = []
+        for i in indexes:
+            e = self.history[i]
+            members = self._shown_groups[e.get("group", "")]
+            if len(members) < 2 or members[-1] is e or e["group"] in self._expanded_groups:
+                out.append(i)
+        return out
+
+    def _history_row(self, i: int, grouped: bool) -> str:
+        e = self.history[i]
+        ts = (e.get("time") or "").split(" ")[-1][:8]
+        snippet = e["text"][:256].replace("\n", "\\n")
+        if len(snippet) > 64:
+            snippet = snippet[:64] + "…"
+        uses = e.get("uses", 1)
+        if uses > 1:
+            snippet = f"×{uses} {snippet}"
+        members = self._shown_groups.get(e.get("group", ""), []) if grouped else []
+        if len(members) > 1:
+            if members[-1] is e:
+                mark = "▾" if e["group"] in self._expanded_groups else "▸"
+                snippet = f"{mark} +{len(members) - 1} similar | {snippet}"
+            else:
+                return f"   ↳ {ts} | {snippet}"
+        return f"{ts} | {snippet}"
+
+    def _toggle_group(self) -> None:
+        entry = self._get_selected_history_entry()
+        if not entry or len(self._shown_groups.get(entry.get("group", ""), ())) < 2:
+            return
+        self._expanded_groups ^= {entry["group"]}
+        self._apply_search()
+
     def _update_preview(self, from_favorites: bool) -> None:
         if from_favorites:
             idx = self._get_selected_fav_index()
@@ -410,7 +794,7 @@ class Copy2App(ttk.Frame):
     def _open_settings(self) -> None:
         win = tk.Toplevel(self.master)
         win.title("Settings")
-        win.geometry("520x520")
+        win.geometry("520x720")
         win.transient(self.master)
         win.grab_set()
 
@@ -422,21 +806,46 @@ class Copy2App(ttk.Frame):
         max_var = tk.StringVar(value=str(self.cfg.max_history))
         ttk.Entry(frm, textvariable=max_var, width=10).grid(row=0, column=1, sticky="w")
 
-        ttk.Label(frm, text="Clipboard poll interval (ms)").grid(row=1, column=0, sticky="w", pady=(8, 0))
+        ttk.Label(frm, text="History size (max MB)").grid(row=1, column=0, sticky="w", pady=(8, 0))
+        mb_var = tk.StringVar(value=str(self.cfg.max_history_mb))
+        ttk.Entry(frm, textvariable=mb_var, width=10).grid(row=1, column=1, sticky="w", pady=(8, 0))
+        usage = (
+            f"In use: {format_bytes(self.history.total_bytes)} of {format_bytes(self.history.max_bytes)}"
+            f" ({len(self.history)} items)"
+        )
+        ttk.Label(frm, text=usage).grid(row=2, column=0, columnspan=2, sticky="w")
+
+        ttk.Label(frm, text="Clipboard poll interval (ms)").grid(row=3, column=0, sticky="w", pady=(8, 0))
         poll_var = tk.StringVar(value=str(self.cfg.poll_interval_ms))
-        ttk.Entry(frm, textvariable=poll_var, width=10).grid(row=1, column=1, sticky="w", pady=(8, 0))
+        ttk.Entry(frm, textvariable=poll_var, width=10).grid(row=3, column=1, sticky="w", pady=(8, 0))
 
-        ttk.Separator(frm).grid(row=2, column=0, columnspan=2, sticky="ew", pady=12)
+        ttk.Separator(frm).grid(row=4, column=0, columnspan=2, sticky="ew", pady=12)
 
         # Hotkeys
         ttk.Checkbutton(frm, text="Enable global hotkeys (best effort)", variable=self.enable_hotkeys).grid(
-            row=3, column=0, columnspan=2, sticky="w"
+            row=5, column=0, columnspan=2, sticky="w"
         )
         ttk.Checkbutton(frm, text="Attempt auto-paste (Ctrl+V injection)", variable=self.send_paste).grid(
-            row=4, column=0, columnspan=2, sticky="w", pady=(6, 0)
+            row=6, column=0, columnspan=2, sticky="w", pady=(6, 0)
+        )
+
+        trace_var = tk.BooleanVar(value=self.cfg.record_trace)
+        ttk.Checkbutton(frm, text="Record clipboard trace (sizes and hashes only)", variable=trace_var).grid(
+            row=7, column=0, columnspan=2, sticky="w", pady=(6, 0)
         )
 
-        row = 5
+        ttk.Button(
+            frm, text=f"Record performance profile ({DEFAULT_SECONDS} s)", command=lambda: self._start_profile()
+        ).grid(row=8, column=0, columnspan=2, sticky="w", pady=(6, 0))
+
+        ttk.Label(frm, text="Log UI stalls longer than (ms, 0 = off)").grid(row=9, column=0, sticky="w", pady=(6, 0))
+        stall_var = tk.StringVar(value=str(self.cfg.stall_threshold_ms))
+        ttk.Entry(frm, textvariable=stall_var, width=10).grid(row=9, column=1, sticky="w", pady=(6, 0))
+        ttk.Label(frm, text=self._watchdog.summary_text(), wraplength=480, justify="left").grid(
+            row=10, column=0, columnspan=2, sticky="w"
+        )
+
+        row = 11
         hk_vars: Dict[str, tk.StringVar] = {}
         for key, label in [
             ("paste_reversed", "Paste reversed"),
@@ -468,15 +877,28 @@ class Copy2App(ttk.Frame):
         def on_save() -> None:
             # Validate and apply
             self.cfg.max_history = max(1, min(500, int(max_var.get() or self.cfg.max_history)))
+            self.cfg.max_history_mb = max(1, min(4096, int(mb_var.get() or self.cfg.max_history_mb)))
             self.cfg.poll_interval_ms = max(100, min(5000, int(poll_var.get() or self.cfg.poll_interval_ms)))
             self.cfg.enable_hotkeys = bool(self.enable_hotkeys.get())
             self.cfg.send_paste = bool(self.send_paste.get())
+            self.cfg.record_trace = bool(trace_var.get())
+            stall_ms = max(0, min(10000, int(stall_var.get() or self.cfg.stall_threshold_ms)))
+            if stall_ms != self.cfg.stall_threshold_ms:
+                self.cfg.stall_threshold_ms = stall_ms
+                self._watchdog.stop()
+                self._watchdog.threshold_ms = stall_ms
+                self._watchdog.start()
             for k, v in hk_vars.items():
                 if v.get().strip():
                     self.cfg.hotkeys[k] = v.get().strip().lower()
             save_config(self.cfg)
 
             # Apply runtime changes
+            if self.history.set_limits(self.cfg.max_history, self.cfg.max_history_mb * 1024 * 1024, self.cfg.favorites):
+                if not self.session_only.get():
+                    save_history(self.history.entries)
+                self._refresh_lists()
+            self._set_trace_recording(self.cfg.record_trace or bool(os.environ.get("COPY2_TRACE")))
             self._restart_hotkeys()
             self._set_status("Settings saved")
             win.destroy()
@@ -493,7 +915,7 @@ class Copy2App(ttk.Frame):
             "What it does:\n"
             "- Watches your clipboard and keeps a history\n"
             "- Lets you copy any previous item back to clipboard\n"
-            "- Reverse-line copy (useful for log blocks, lists, etc.)\n"
+            "- Line transforms: reverse, sort, unique, trim, join, case (useful for log blocks, lists, etc.)\n"
             "- Favorites\n\n"
             "Install notes:\n"
             "- Needs Python 3 + Tkinter (python3-tk)\n"
@@ -518,9 +940,9 @@ class Copy2App(ttk.Frame):
         if hk.get("paste_reversed"):
             mapping[to_pynput_combo(hk["paste_reversed"])] = lambda: safe(self._reverse_selected)
         if hk.get("cycle_back"):
-            mapping[to_pynput_combo(hk["cycle_back"])] = lambda: safe(lambda: self._cycle_history(-1))
+            mapping[to_pynput_combo(hk["cycle_back"])] = lambda: self._queue_cycle(-1)
         if hk.get("cycle_forward"):
-            mapping[to_pynput_combo(hk["cycle_forward"])] = lambda: safe(lambda: self._cycle_history(1))
+            mapping[to_pynput_combo(hk["cycle_forward"])] = lambda: self._queue_cycle(1)
         if hk.get("pause"):
             mapping[to_pynput_combo(hk["pause"])] = lambda: safe(self._toggle_pause_state)
         if hk.get("search_focus"):
@@ -537,27 +959,63 @@ class Copy2App(ttk.Frame):
         if not ok and err:
             messagebox.showwarning("Hotkeys not available", err)
             self._hotkeys = None
+            return
+
+        if self.send_paste.get():
+            # Open the injection connection now rather than on the first cycle press
+            paste_injector().warm()
 
     def _stop_hotkeys(self) -> None:
         if self._hotkeys:
             self._hotkeys.stop()
             self._hotkeys = None
 
-    def _cycle_history(self, delta: int) -> None:
-        if not self._filtered_indexes:
+    def _queue_cycle(self, delta: int) -> None:
+        """Hotkey-thread entry point: accumulate presses, schedule at most one Tk callback."""
+        with self._cycle_lock:
+            self._pending_cycle += delta
+            if self._cycle_started is not None:
+                return
+            self._cycle_started = time.perf_counter()
+        self.master.after(0, self._flush_cycle)
+
+    def _flush_cycle(self) -> None:
+        with self._cycle_lock:
+            delta, started = self._pending_cycle, self._cycle_started
+            self._pending_cycle = 0
+            self._cycle_started = None
+        if delta:
+            self._cycle_history(delta, started)
+
+    def _cycle_history(self, delta: int, started: Optional[float] = None) -> None:
+        rows = [r for r, i in enumerate(self._filtered_indexes) if i >= 0]
+        if not rows:
             return
         sel = list(self.history_list.curselection())
-        pos = sel[0] if sel else 0
-        pos = (pos + delta) % len(self._filtered_indexes)
+        cur = rows.index(sel[0]) if sel and sel[0] in rows else 0
+        pos = rows[(cur + delta) % len(rows)]
         self.history_list.selection_clear(0, tk.END)
         self.history_list.selection_set(pos)
         self.history_list.activate(pos)
         self.history_list.see(pos)
-        self._copy_selected()
-        if self.send_paste.get():
-            ok, _ = send_ctrl_v_best_effort()
-            if ok:
-                self._set_status("Cycled + pasted (best effort)")
+
+        entry = self.history[self._filtered_indexes[pos]]
+        err = self._write_entry_to_clipboard(entry)
+        if err:
+            messagebox.showerror("Clipboard error", err)
+            return
+        if not self.send_paste.get():
+            self._set_status("Copied to clipboard")
+            return
+
+        # Only inject once the new text owns the clipboard, otherwise the target pastes the previous item
+        if not self._await_clipboard(entry["text"]):
+            self._set_status("Cycled; clipboard not ready, paste skipped")
+            return
+        ok, _ = send_ctrl_v_best_effort(started)
+        if ok:
+            latency = paste_injector().last_latency_ms or 0.0
+            self._set_status(f"Cycled + pasted (best effort, {latency:.0f} ms)")
 
     def _toggle_pause_state(self) -> None:
         self.paused.set(not self.paused.get())
@@ -581,10 +1039,14 @@ class Copy2App(ttk.Frame):
         try:
             # Persist history unless session-only
             if not self.session_only.get():
-                save_history(self.history)
+                save_history(self.history.entries)
             save_config(self.cfg)
         finally:
             self._stop_hotkeys()
+            self._set_trace_recording(False)
+            self._search.close()
+            self._watchdog.stop()
+            hand_off_clipboard()
             self.master.destroy()
 
 
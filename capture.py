@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Collection, Dict, List, Optional, Tuple
+
+from clipboard import get_clipboard_text, last_backend
+from cliptrace import TraceRecorder
+from history import History, entry_hash
+from storage import make_entry
+
+
+@dataclass
+class Capture:
+    """Outcome of a poll that saw new clipboard text.
+
+    kind is "new", "moved" (already in history, brought to the top) or
+    "too_large" (evicted straight away by the byte budget).
+    """
+
+    kind: str
+    entry: Dict[str, Any]
+
+
+@dataclass
+class CapturePipeline:
+    """Clipboard capture without any UI: read, decide, store, persist.
+
+    The app polls this from a Tk timer; the replay harness drives it with a
+    fake `read` and a temporary `persist` target.
+    """
+
+    history: History
+    favorites: Callable[[], Collection[str]] = lambda: ()
+    persist: Optional[Callable[[List[Dict[str, Any]]], None]] = None
+    read: Callable[[], Tuple[Optional[str], Optional[str]]] = get_clipboard_text
+    backend: Callable[[], str] = last_backend
+    recorder: Optional[TraceRecorder] = None
+    last_text: Optional[str] = None
+    # Set after we write the clipboard ourselves so the next poll doesn't capture it
+    ignore_once: bool = False
+
+    def seed(self) -> None:
+        """Remember what's on the clipboard now so it isn't captured on the first poll."""
+        self.last_text, _err = self.read()
+
+    def poll(self) -> Tuple[Optional[Capture], Optional[str]]:
+        """Read the clipboard once; returns (capture or None, error_message)."""
+        t0 = time.perf_counter()
+        txt, err = self.read()
+        if err:
+            return None, err
+        if not isinstance(txt, str):
+            return None, None
+        if self.ignore_once:
+            self.ignore_once = False
+            self.last_text = txt
+            return None, None
+        if not txt or not txt.strip() or txt == self.last_text:
+            return None, None
+        self.last_text = txt
+        return self.add(txt, read_ms=(time.perf_counter() - t0) * 1000.0), None
+
+    def add(self, text: str, read_ms: float = 0.0) -> Optional[Capture]:
+        entry = make_entry(text)
+        if self.recorder is not None:
+            self.recorder.record(len(text), entry_hash(entry), self.backend(), read_ms)
+
+        existing = self.history.find(entry)
+        if existing is not None:
+            if existing is self.history[-1]:
+                return None
+            self.history.move_to_front(existing, entry["time"], entry["ts"])
+            self._persist()
+            return Capture("moved", existing)
+
+        evicted = self.history.append(entry, self.favorites())
+        self._persist()
+        if any(e is entry for e in evicted):
+            return Capture("too_large", entry)
+        return Capture("new", entry)
+
+    def _persist(self) -> None:
+        if self.persist is not None:
+            self.persist(self.history.entries)
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+import os
 import subprocess
-from typing import Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import pyperclip
 
@@ -12,12 +13,21 @@ def _cmd_exists(cmd: str) -> bool:
     return which(cmd) is not None
 
 
+# Helpers run on the Tk thread. If the clipboard owner never answers (or is
+# ourselves, blocked in this very call), give up rather than freeze the UI.
+HELPER_TIMEOUT_S = 2.0
+
+
 def _run_capture(args: list[str]) -> Tuple[Optional[str], Optional[str]]:
     try:
-        p = subprocess.run(args, check=True, text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        p = subprocess.run(
+            args, check=True, text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=HELPER_TIMEOUT_S
+        )
         return p.stdout, None
     except FileNotFoundError:
         return None, None
+    except subprocess.TimeoutExpired:
+        return None, f"{args[0]} did not answer within {HELPER_TIMEOUT_S:g}s"
     except subprocess.CalledProcessError as e:
         msg = (e.stderr or e.stdout or str(e)).strip()
         return None, msg or "Clipboard helper failed"
@@ -27,10 +37,20 @@ def _run_capture(args: list[str]) -> Tuple[Optional[str], Optional[str]]:
 
 def _run_input(args: list[str], text: str) -> Optional[str]:
     try:
-        subprocess.run(args, check=True, text=True, input=text, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        subprocess.run(
+            args,
+            check=True,
+            text=True,
+            input=text,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=HELPER_TIMEOUT_S,
+        )
         return None
     except FileNotFoundError:
         return None
+    except subprocess.TimeoutExpired:
+        return f"{args[0]} did not finish within {HELPER_TIMEOUT_S:g}s"
     except subprocess.CalledProcessError as e:
         msg = (e.stderr or e.stdout or str(e)).strip()
         return msg or "Clipboard helper failed"
@@ -38,18 +58,94 @@ def _run_input(args: list[str], text: str) -> Optional[str]:
         return f"Clipboard helper error: {e}"
 
 
+# Richer targets worth keeping alongside the plain text of a capture.
+RICH_TARGETS: Tuple[str, ...] = ("text/html", "text/uri-list")
+
+# Tk widget used as the in-process backend; see use_tk_backend().
+_tk_widget: Any = None
+
+# Name of the backend that served the last successful read (for traces and diagnostics).
+_last_backend = ""
+
+
+def last_backend() -> str:
+    return _last_backend
+
+
+def use_tk_backend(widget: Any) -> None:
+    """Read and write the CLIPBOARD selection through Tk when possible.
+
+    Tk talks to the X server (or XWayland) from inside the process, so nothing is
+    forked and no helper has to stay around to serve the selection. Only call the
+    clipboard functions from the Tk thread while this is enabled. Pass None to
+    go back to the helper chain only.
+    """
+    global _tk_widget
+    _tk_widget = widget
+
+
+def _tk_reads_ok() -> bool:
+    # XWayland only mirrors the Wayland clipboard lazily; wl-paste sees native clients reliably.
+    return _tk_widget is not None and not (
+        os.environ.get("XDG_SESSION_TYPE", "").lower() == "wayland" or os.environ.get("WAYLAND_DISPLAY")
+    )
+
+
+def _tk_owns_clipboard() -> bool:
+    if _tk_widget is None:
+        return False
+    try:
+        return bool(_tk_widget.tk.call("selection", "own", "-selection", "CLIPBOARD"))
+    except Exception:
+        return False
+
+
+def sync_tk_clipboard(text: str) -> bool:
+    """If Tk owns CLIPBOARD with `text`, make sure the X server knows; True when it does.
+
+    Reading our own selection back is answered inside the process and says nothing
+    about what other clients see: Tk's XSetSelectionOwner may still be buffered.
+    A request that needs a reply (a pointer query) only comes back after the
+    server has processed everything sent before it.
+    """
+    if not _tk_owns_clipboard():
+        return False
+    try:
+        if _tk_widget.clipboard_get() != text:
+            return False
+        _tk_widget.update_idletasks()
+        _tk_widget.winfo_pointerxy()
+    except Exception:
+        return False
+    return True
+
+
 def get_clipboard_text() -> Tuple[Optional[str], Optional[str]]:
     """Return (text, error_message).
 
     Strategy:
+    0) Tk selection (in-process, when enabled via use_tk_backend)
     1) pyperclip (preferred when configured)
     2) wl-clipboard (Wayland)
     3) xclip / xsel (X11)
     """
+    global _last_backend
+
+    # 0) Tk, or anything we own ourselves
+    if _tk_reads_ok() or _tk_owns_clipboard():
+        try:
+            txt = _tk_widget.clipboard_get()
+            _last_backend = "tk"
+            return txt, None
+        except Exception:
+            # Empty clipboard or a non-text owner; let the helpers have a go
+            pass
+
     # 1) pyperclip
     try:
         txt = pyperclip.paste()
         if isinstance(txt, str):
+            _last_backend = "pyperclip"
             return txt, None
     except pyperclip.PyperclipException:
         pass
@@ -63,6 +159,7 @@ def get_clipboard_text() -> Tuple[Optional[str], Optional[str]]:
     if _cmd_exists("wl-paste"):
         out, e = _run_capture(["wl-paste", "-n"])
         if out is not None:
+            _last_backend = "wl-paste"
             return out, None
         if e:
             last_err = e
@@ -71,6 +168,7 @@ def get_clipboard_text() -> Tuple[Optional[str], Optional[str]]:
     if _cmd_exists("xclip"):
         out, e = _run_capture(["xclip", "-selection", "clipboard", "-o"])
         if out is not None:
+            _last_backend = "xclip"
             return out, None
         if e:
             last_err = e
@@ -78,6 +176,7 @@ def get_clipboard_text() -> Tuple[Optional[str], Optional[str]]:
     if _cmd_exists("xsel"):
         out, e = _run_capture(["xsel", "--clipboard", "--output"])
         if out is not None:
+            _last_backend = "xsel"
             return out, None
         if e:
             last_err = e
@@ -87,6 +186,15 @@ def get_clipboard_text() -> Tuple[Optional[str], Optional[str]]:
 
 def set_clipboard_text(text: str) -> Optional[str]:
     """Set clipboard; returns error message if it fails."""
+    # 0) Tk owns the selection itself
+    if _tk_widget is not None:
+        try:
+            _tk_widget.clipboard_clear()
+            _tk_widget.clipboard_append(text)
+            return None
+        except Exception:
+            pass
+
     # 1) pyperclip
     try:
         pyperclip.copy(text)
@@ -121,6 +229,94 @@ def set_clipboard_text(text: str) -> Optional[str]:
     return _hint(last_err or "No clipboard backend available")
 
 
+def list_clipboard_targets() -> Tuple[List[str], Optional[str]]:
+    """Return (targets, error_message) offered by the current clipboard owner.
+
+    Only the target names are requested, so this costs about as much as a plain read.
+    xsel cannot list targets; an empty list just means "plain text only".
+    """
+    last_err: Optional[str] = None
+
+    if _cmd_exists("wl-paste"):
+        out, e = _run_capture(["wl-paste", "--list-types"])
+        if out is not None:
+            return _split_targets(out), None
+        if e:
+            last_err = e
+
+    if _cmd_exists("xclip"):
+        out, e = _run_capture(["xclip", "-selection", "clipboard", "-t", "TARGETS", "-o"])
+        if out is not None:
+            return _split_targets(out), None
+        if e:
+            last_err = e
+
+    return [], last_err
+
+
+def get_clipboard_target(target: str) -> Tuple[Optional[str], Optional[str]]:
+    """Return (data, error_message) for one clipboard target, e.g. 'text/html'."""
+    last_err: Optional[str] = None
+
+    if _cmd_exists("wl-paste"):
+        out, e = _run_capture(["wl-paste", "-n", "-t", target])
+        if out is not None:
+            return out, None
+        if e:
+            last_err = e
+
+    if _cmd_exists("xclip"):
+        out, e = _run_capture(["xclip", "-selection", "clipboard", "-t", target, "-o"])
+        if out is not None:
+            return out, None
+        if e:
+            last_err = e
+
+    return None, last_err or "No clipboard helper can read target " + target
+
+
+def set_clipboard_formats(text: str, formats: Dict[str, str], widget: Any = None) -> Optional[str]:
+    """Set plain text plus extra targets; returns error message if it fails.
+
+    The helper tools can only serve one target per process, so all formats are
+    offered through Tk's own clipboard (the given widget, or the one registered
+    with use_tk_backend). Without Tk only the plain text is restored.
+    """
+    widget = widget if widget is not None else _tk_widget
+    if widget is not None and formats:
+        try:
+            widget.clipboard_clear()
+            widget.clipboard_append(text)
+            for target, data in formats.items():
+                widget.clipboard_append(data, type=target, format="UTF8_STRING")
+            return None
+        except Exception:
+            pass
+    return set_clipboard_text(text)
+
+
+def hand_off_clipboard() -> Optional[str]:
+    """Before Tk goes away, pass our clipboard contents to a helper so they survive exit.
+
+    Returns error message if it fails; does nothing when someone else owns the clipboard.
+    """
+    if not _tk_owns_clipboard():
+        use_tk_backend(None)
+        return None
+    try:
+        text = _tk_widget.clipboard_get()
+    except Exception:
+        text = None
+    use_tk_backend(None)
+    if not text:
+        return None
+    return set_clipboard_text(text)
+
+
+def _split_targets(out: str) -> List[str]:
+    return [t.strip() for t in out.splitlines() if t.strip()]
+
+
 def _hint(msg: str) -> str:
     m = (msg or "").strip()
     base = (
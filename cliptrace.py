@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import json
+import random
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, TextIO
+
+
+@dataclass
+class TraceRecorder:
+    """Appends one JSON line per captured clipboard change.
+
+    Only metadata is written (time, size, content hash, backend), never the
+    text itself, so a trace can be attached to a bug report. The file is
+    rotated to `<name>.1` once it grows past `max_bytes`.
+    """
+
+    path: Path
+    max_bytes: int = 5 * 1024 * 1024
+    _fh: Optional[TextIO] = None
+
+    def record(self, size: int, digest: str, backend: str, read_ms: float = 0.0) -> None:
+        event = {"t": time.time(), "size": size, "hash": digest, "backend": backend, "read_ms": round(read_ms, 3)}
+        try:
+            if self._fh is None:
+                self._fh = self.path.open("a", encoding="utf-8")
+            self._fh.write(json.dumps(event) + "\n")
+            self._fh.flush()
+            if self._fh.tell() > self.max_bytes:
+                self._rotate()
+        except OSError:
+            # Tracing must never break capture
+            self.close()
+
+    def _rotate(self) -> None:
+        self.close()
+        self.path.replace(self.path.with_name(self.path.name + ".1"))
+
+    def close(self) -> None:
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            finally:
+                self._fh = None
+
+
+def load_trace(path: Path) -> List[Dict[str, Any]]:
+    """Read a trace file, skipping lines that aren't valid events."""
+    events: List[Dict[str, Any]] = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        try:
+            ev = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(ev, dict) and isinstance(ev.get("t"), (int, float)) and isinstance(ev.get("hash"), str):
+            ev["size"] = int(ev.get("size", 0))
+            events.append(ev)
+    events.sort(key=lambda ev: ev["t"])
+    return events
+
+
+def synthetic_trace(count: int, rate_hz: float, size: int = 200, repeat_ratio: float = 0.1, seed: int = 0) -> List[Dict[str, Any]]:
+    """Build a burst of `count` copies at `rate_hz`; `repeat_ratio` of them re-copy an earlier clip."""
+    rng = random.Random(seed)
+    events: List[Dict[str, Any]] = []
+    for i in range(count):
+        if events and rng.random() < repeat_ratio:
+            digest = rng.choice(events)["hash"]
+        else:
+            digest = f"{rng.getrandbits(128):032x}"
+        if events and digest == events[-1]["hash"]:
+            # The clipboard can't "change" to what it already holds
+            digest = f"{rng.getrandbits(128):032x}"
+        events.append({"t": i / rate_hz, "size": size, "hash": digest, "backend": "synthetic"})
+    return events
@@ -0,0 +1,396 @@
+from __future__ import annotations
+
+import hashlib
+import sys
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Collection, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from neardup import NearDupIndex, simhash
+
+
+def content_hash(text: str) -> str:
+    """Stable digest of a clip's text, used to find re-captured clips in O(1)."""
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+
+def entry_hash(entry: Dict[str, Any]) -> str:
+    """Return the entry's content hash, computing and storing it on first use."""
+    h = entry.get("hash")
+    if not isinstance(h, str) or not h:
+        h = content_hash(entry["text"])
+        entry["hash"] = h
+    return h
+
+
+def entry_bytes(entry: Dict[str, Any]) -> int:
+    """Approximate memory held by one entry: its text plus any rich formats.
+
+    sys.getsizeof is O(1) for str, so this never walks a large clip.
+    """
+    size = sys.getsizeof(entry.get("text", ""))
+    for data in (entry.get("formats") or {}).values():
+        size += sys.getsizeof(data)
+    return size
+
+
+@dataclass
+class Batch:
+    """Changes to apply to a History in one go (see History.apply_batch).
+
+    Each list holds stored entries, e.g. the current multi-selection. Moved
+    entries become the newest ones, keeping their relative order; `time_str`
+    is their new display time.
+    """
+
+    delete: List[Dict[str, Any]] = field(default_factory=list)
+    move_to_front: List[Dict[str, Any]] = field(default_factory=list)
+    favorite: List[Dict[str, Any]] = field(default_factory=list)
+    unfavorite: List[Dict[str, Any]] = field(default_factory=list)
+    export: List[Dict[str, Any]] = field(default_factory=list)
+    time_str: Optional[str] = None
+
+
+@dataclass
+class BatchResult:
+    removed: List[Dict[str, Any]] = field(default_factory=list)
+    moved: List[Dict[str, Any]] = field(default_factory=list)
+    exported: List[Dict[str, Any]] = field(default_factory=list)
+    favorites: List[str] = field(default_factory=list)
+    favorites_changed: bool = False
+
+    @property
+    def history_changed(self) -> bool:
+        return bool(self.removed or self.moved)
+
+
+@dataclass
+class History:
+    """Clipboard history (oldest first) with a running byte total.
+
+    Behaves like a read-only list for the UI. Retention is bounded by both
+    `max_items` and `max_bytes`; the total is updated on every add/remove so
+    checking the budget never re-sums the history. Entries are unique by
+    content hash: a clip that is already present is moved to the newest slot
+    instead of being stored twice. Near-duplicates (similar SimHash) share a
+    "group" label, the content hash of the first member seen.
+
+    Entries are kept in time order and every entry carries a non-decreasing
+    numeric "ts", mirrored in a sorted list so time ranges are two bisects.
+    """
+
+    max_items: int
+    max_bytes: int
+    entries: List[Dict[str, Any]] = field(default_factory=list)
+    total_bytes: int = 0
+    _sizes: Dict[int, int] = field(default_factory=dict)
+    _by_hash: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    _near: NearDupIndex = field(default_factory=NearDupIndex)
+    _groups: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    _ts: List[float] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        self._reset(self.entries)
+
+    def _reset(self, entries: List[Dict[str, Any]]) -> None:
+        self.total_bytes = 0
+        self._sizes = {}
+        self._by_hash = {}
+        self._near.clear()
+        self._groups = {}
+        # Collapse duplicates from older files: the newest copy keeps its place, uses add up
+        latest: Dict[str, Dict[str, Any]] = {}
+        for e in entries:
+            h = entry_hash(e)
+            prev = latest.pop(h, None)
+            if prev is not None:
+                e["uses"] = int(e.get("uses", 1)) + int(prev.get("uses", 1))
+            latest[h] = e
+        self.entries = []
+        self._ts = []
+        for e in latest.values():
+            self._track(e)
+            self._stamp(e)
+            self.entries.append(e)
+
+    # ---- list-like access ----
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.entries)
+
+    def __getitem__(self, i):
+        return self.entries[i]
+
+    def __bool__(self) -> bool:
+        return bool(self.entries)
+
+    def contains(self, entry: Dict[str, Any]) -> bool:
+        return id(entry) in self._sizes
+
+    def group_members(self, entry: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Entries in the same near-duplicate group (oldest first), including `entry`."""
+        return self._groups.get(entry.get("group", ""), [entry])
+
+    def range_indexes(self, start: float, end: float) -> Tuple[int, int]:
+        """Return (lo, hi) so that entries[lo:hi] have start <= ts < end."""
+        return bisect_left(self._ts, start), bisect_left(self._ts, end)
+
+    def find(self, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return the stored entry with the same content as `entry`, if any."""
+        return self._by_hash.get(entry_hash(entry))
+
+    # ---- accounting ----
+    def _track(self, entry: Dict[str, Any]) -> None:
+        size = entry_bytes(entry)
+        self._sizes[id(entry)] = size
+        self.total_bytes += size
+        h = entry_hash(entry)
+        self._by_hash[h] = entry
+        self._track_group(entry, h)
+
+    def _untrack(self, entry: Dict[str, Any]) -> None:
+        self.total_bytes -= self._sizes.pop(id(entry), 0)
+        h = entry.get("hash")
+        if self._by_hash.get(h) is entry:
+            del self._by_hash[h]
+        members = self._groups.get(entry.get("group", ""))
+        if members is not None:
+            members[:] = [e for e in members if e is not entry]
+            if not members:
+                del self._groups[entry["group"]]
+        if isinstance(entry.get("simhash"), int):
+            self._near.remove(entry)
+
+    def _untrack_many(self, entries: List[Dict[str, Any]]) -> None:
+        """Like _untrack for each entry, but every group and LSH bucket is filtered once."""
+        ids = {id(e) for e in entries}
+        groups = set()
+        for e in entries:
+            self.total_bytes -= self._sizes.pop(id(e), 0)
+            h = e.get("hash")
+            if self._by_hash.get(h) is e:
+                del self._by_hash[h]
+            groups.add(e.get("group", ""))
+        for g in groups:
+            members = self._groups.get(g)
+            if members is not None:
+                members[:] = [m for m in members if id(m) not in ids]
+                if not members:
+                    del self._groups[g]
+        self._near.remove_many([e for e in entries if isinstance(e.get("simhash"), int)])
+
+    def _stamp(self, entry: Dict[str, Any], ts: Optional[float] = None) -> None:
+        """Give a newly last entry its ts, never earlier than the one before it."""
+        last = self._ts[-1] if self._ts else 0.0
+        if ts is None:
+            ts = entry.get("ts")
+        if not isinstance(ts, (int, float)) or ts < last:
+            # Unknown (old imports) or out of order: sort it in right after its predecessor
+            ts = last
+        entry["ts"] = float(ts)
+        self._ts.append(entry["ts"])
+
+    def _sync_ts(self) -> None:
+        self._ts = [e["ts"] for e in self.entries]
+
+    def _track_group(self, entry: Dict[str, Any], h: str) -> None:
+        if not isinstance(entry.get("simhash"), int):
+            sig = simhash(entry["text"])
+            if sig is None:
+                entry["group"] = h
+                return
+            entry["simhash"] = sig
+        similar = self._near.find(entry["simhash"])
+        entry["group"] = similar["group"] if similar is not None else h
+        self._groups.setdefault(entry["group"], []).append(entry)
+        self._near.add(entry)
+
+    def refresh_size(self, entry: Dict[str, Any]) -> None:
+        """Re-account an entry after its formats changed in place."""
+        if not self.contains(entry):
+            return
+        self._untrack(entry)
+        self._track(entry)
+
+    # ---- mutation ----
+    def append(self, entry: Dict[str, Any], favorites: Collection[str] = ()) -> List[Dict[str, Any]]:
+        """Add a new entry and enforce the limits; returns evicted entries.
+
+        If the same text is already stored, that entry is moved to the newest
+        slot instead (see move_to_front) and `entry` is dropped.
+        """
+        existing = self.find(entry)
+        if existing is not None:
+            self.move_to_front(existing, entry.get("time"), entry.get("ts"))
+            return []
+        self._track(entry)
+        self._stamp(entry)
+        self.entries.append(entry)
+        return self.enforce(favorites)
+
+    def move_to_front(self, entry: Dict[str, Any], time_str: Optional[str] = None, ts: Optional[float] = None) -> None:
+        """Make an existing entry the newest one and count the reuse."""
+        if self.entries and self.entries[-1] is not entry:
+            self.entries.remove(entry)
+            self._sync_ts()
+            self._stamp(entry, ts if ts is not None else time.time())
+            self.entries.append(entry)
+            members = self._groups.get(entry.get("group", ""))
+            if members and members[-1] is not entry:
+                members.remove(entry)
+                members.append(entry)
+        elif time_str:
+            # Already the newest: move its ts along with the displayed time
+            ts = ts if ts is not None else time.time()
+            entry["ts"] = self._ts[-1] = max(float(ts), entry["ts"])
+        entry["uses"] = int(entry.get("uses", 1)) + 1
+        if time_str:
+            entry["time"] = time_str
+
+    def apply_batch(self, batch: Batch, favorites: Sequence[str] = ()) -> BatchResult:
+        """Apply every change in `batch` with a single pass over the history.
+
+        Returns what happened, including the updated favorites list, so the
+        caller can persist and redraw once. Exported entries are collected
+        before deletion, so a batch can export and delete the same selection.
+        Moves are a reorder, not a reuse: "uses" is left alone.
+        """
+        result = BatchResult(exported=[e for e in batch.export if self.contains(e)])
+
+        favs = list(favorites)
+        drop = {e["text"] for e in batch.unfavorite}
+        if drop:
+            favs = [f for f in favs if f not in drop]
+        present = set(favs)
+        for e in batch.favorite:
+            if e["text"] not in present:
+                present.add(e["text"])
+                favs.append(e["text"])
+        result.favorites = favs
+        result.favorites_changed = favs != list(favorites)
+
+        doomed = {id(e) for e in batch.delete if self.contains(e)}
+        moving = {id(e) for e in batch.move_to_front if self.contains(e) and id(e) not in doomed}
+        if not doomed and not moving:
+            return result
+
+        kept: List[Dict[str, Any]] = []
+        for e in self.entries:
+            if id(e) in doomed:
+                result.removed.append(e)
+            elif id(e) in moving:
+                result.moved.append(e)
+            else:
+                kept.append(e)
+        self._untrack_many(result.removed)
+        self.entries = kept
+        self._sync_ts()
+
+        now = time.time()
+        for e in result.moved:
+            self._stamp(e, now)
+            self.entries.append(e)
+            if batch.time_str:
+                e["time"] = batch.time_str
+        # Keep each touched group oldest-first: moved members go last
+        for g in {e.get("group", "") for e in result.moved}:
+            members = self._groups.get(g)
+            if members:
+                members[:] = [m for m in members if id(m) not in moving] + [m for m in members if id(m) in moving]
+        return result
+
+    def replace(self, entries: List[Dict[str, Any]], favorites: Collection[str] = ()) -> List[Dict[str, Any]]:
+        self._reset(entries)
+        return self.enforce(favorites)
+
+    def clear(self) -> None:
+        self._reset([])
+
+    def set_limits(self, max_items: int, max_bytes: int, favorites: Collection[str] = ()) -> List[Dict[str, Any]]:
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        return self.enforce(favorites)
+
+    def enforce(self, favorites: Collection[str] = ()) -> List[Dict[str, Any]]:
+        """Evict until both limits hold; returns evicted entries.
+
+        The item cap drops the oldest entries, as it always has. The byte budget
+        prefers non-favorite entries and, among those, the ones with the largest
+        size * age (age counted in positions from the newest).
+        """
+        evicted: List[Dict[str, Any]] = []
+
+        over = len(self.entries) - self.max_items
+        if over > 0:
+            evicted.extend(self.entries[:over])
+            self._untrack_many(self.entries[:over])
+            self.entries = self.entries[over:]
+            self._ts = self._ts[over:]
+
+        if self.total_bytes > self.max_bytes:
+            favs = set(favorites)
+            n = len(self.entries)
+
+            def score(i: int) -> tuple:
+                e = self.entries[i]
+                # Non-favorites first, then the biggest size-by-age product
+                return (e["text"] not in favs, self._sizes.get(id(e), 0) * (n - i))
+
+            victims = set()
+            excess = self.total_bytes - self.max_bytes
+            for i in sorted(range(n), key=score, reverse=True):
+                if excess <= 0:
+                    break
+                victims.add(i)
+                excess -= self._sizes.get(id(self.entries[i]), 0)
+
+            kept: List[Dict[str, Any]] = []
+            dropped: List[Dict[str, Any]] = []
+            for i, e in enumerate(self.entries):
+                (dropped if i in victims else kept).append(e)
+            self._untrack_many(dropped)
+            evicted.extend(dropped)
+            self.entries = kept
+            self._sync_ts()
+
+        return evicted
+
+
+def date_buckets(now: Optional[datetime] = None) -> List[Tuple[str, float]]:
+    """(label, start ts) for the history view's date headers, oldest first."""
+    now = now or datetime.now()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    yesterday = today - timedelta(days=1)
+    week = today - timedelta(days=today.weekday())
+    buckets = [("Earlier", 0.0)]
+    if week < yesterday:
+        buckets.append(("This week", week.timestamp()))
+    buckets.append(("Yesterday", yesterday.timestamp()))
+    buckets.append(("Today", today.timestamp()))
+    return buckets
+
+
+# "When" filters offered in the UI: label -> (start, end) ts
+def time_ranges(now: Optional[datetime] = None) -> Dict[str, Tuple[float, float]]:
+    now = now or datetime.now()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    end = float("inf")
+    return {
+        "Last hour": ((now - timedelta(hours=1)).timestamp(), end),
+        "Today": (today.timestamp(), end),
+        "Yesterday": ((today - timedelta(days=1)).timestamp(), today.timestamp()),
+        "This week": ((today - timedelta(days=today.weekday())).timestamp(), end),
+        "Last 7 days": ((today - timedelta(days=6)).timestamp(), end),
+    }
+
+
+def format_bytes(n: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass
-from typing import Callable, Dict, Optional, Tuple
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Optional, Tuple
 
 
 def is_wayland() -> bool:
@@ -81,24 +83,72 @@ class HotkeyManager:
             self.listener = None
 
 
-def send_ctrl_v_best_effort() -> Tuple[bool, Optional[str]]:
+_WAYLAND_PASTE_MSG = (
+    "Ctrl+V key injection is blocked on Wayland sessions.\n\n"
+    "Use the app's Copy button, or paste manually in the target application."
+)
+
+
+@dataclass
+class PasteInjector:
+    """Sends Ctrl+V through one long-lived pynput controller.
+
+    Building a Controller opens a fresh X connection, which is the slow part of an
+    injection; keeping it warm makes repeated pastes cheap. Latency of each call
+    (from `started`, usually the hotkey press, to the key release) is recorded.
+    """
+
+    controller: Optional[object] = None
+    latencies_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=50))
+
+    def warm(self) -> Tuple[bool, Optional[str]]:
+        """Create the controller ahead of the first paste."""
+        if is_wayland():
+            return False, _WAYLAND_PASTE_MSG
+        if self.controller is None:
+            try:
+                from pynput import keyboard
+
+                self.controller = keyboard.Controller()
+            except Exception as e:
+                return False, f"Could not inject Ctrl+V: {e}"
+        return True, None
+
+    def inject(self, started: Optional[float] = None) -> Tuple[bool, Optional[str]]:
+        ok, err = self.warm()
+        if not ok:
+            return ok, err
+        t0 = time.perf_counter() if started is None else started
+        try:
+            from pynput import keyboard
+
+            controller = self.controller
+            with controller.pressed(keyboard.Key.ctrl):
+                controller.press("v")
+                controller.release("v")
+        except Exception as e:
+            # Drop a controller whose display connection went bad; the next call rebuilds it.
+            self.controller = None
+            return False, f"Could not inject Ctrl+V: {e}"
+        self.latencies_ms.append((time.perf_counter() - t0) * 1000.0)
+        return True, None
+
+    @property
+    def last_latency_ms(self) -> Optional[float]:
+        return self.latencies_ms[-1] if self.latencies_ms else None
+
+
+_default_injector = PasteInjector()
+
+
+def send_ctrl_v_best_effort(started: Optional[float] = None) -> Tuple[bool, Optional[str]]:
     """Try to send Ctrl+V keystroke.
 
     Works on many X11 setups; typically blocked on Wayland.
     """
-    if is_wayland():
-        return False, (
-            "Ctrl+V key injection is blocked on Wayland sessions.\n\n"
-            "Use the app's Copy button, or paste manually in the target application."
-        )
-
-    try:
-        from pynput import keyboard
-
-        controller = keyboard.Controller()
-        with controller.pressed(keyboard.Key.ctrl):
-            controller.press("v")
-            controller.release("v")
-        return True, None
-    except Exception as e:
-        return False, f"Could not inject Ctrl+V: {e}"
+    return _default_injector.inject(started)
+
+
+def paste_injector() -> PasteInjector:
+    """Return the shared injector used by send_ctrl_v_best_effort()."""
+    return _default_injector
@@ -77,7 +77,7 @@ fetch_app_files() {
   cp -f "${src}/requirements.txt" "${APP_DIR}/"
 
   # Optional support modules
-  for f in app.py clipboard.py hotkeys.py storage.py __init__.py; do
+  for f in app.py clipboard.py hotkeys.py storage.py history.py neardup.py capture.py cliptrace.py search.py transforms.py profiling.py stallwatch.py __init__.py; do
     if [[ -f "${src}/${f}" ]]; then
       cp -f "${src}/${f}" "${APP_DIR}/"
     fi
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+BITS = 64
+BANDS = 4
+BAND_BITS = BITS // BANDS
+# With 4 bands, any two signatures within 3 bits agree on at least one band, so LSH can't miss them
+MAX_DISTANCE = BANDS - 1
+# Only the head of a clip is fingerprinted; near-duplicates differ in details, not in their first 16K
+SIGNATURE_CHARS = 16 * 1024
+# Short clips don't have enough features for a meaningful signature
+MIN_TOKENS = 8
+SHINGLE = 3
+
+_TOKEN_RE = re.compile(r"\w+")
+_DIGIT_RE = re.compile(r"\d")
+
+
+def simhash(text: str) -> Optional[int]:
+    """64-bit SimHash of `text`, or None if it's too short to compare.
+
+    Digits are folded to 0 first, so the same log line or stack trace with a
+    different timestamp, PID or line number lands on the same signature.
+    """
+    tokens = _TOKEN_RE.findall(_DIGIT_RE.sub("0", text[:SIGNATURE_CHARS].lower()))
+    if len(tokens) < MIN_TOKENS:
+        return None
+    features = Counter(" ".join(tokens[i : i + SHINGLE]) for i in range(len(tokens) - SHINGLE + 1))
+
+    weights = [0] * BITS
+    for feature, weight in features.items():
+        h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8", "surrogatepass"), digest_size=8).digest(), "big")
+        for b in range(BITS):
+            if h >> b & 1:
+                weights[b] += weight
+            else:
+                weights[b] -= weight
+
+    sig = 0
+    for b, w in enumerate(weights):
+        if w > 0:
+            sig |= 1 << b
+    return sig
+
+
+def _bands(sig: int) -> List[Tuple[int, int]]:
+    mask = (1 << BAND_BITS) - 1
+    return [(band, sig >> (band * BAND_BITS) & mask) for band in range(BANDS)]
+
+
+@dataclass
+class NearDupIndex:
+    """LSH buckets over entry signatures, for finding a similar entry in sub-linear time."""
+
+    _buckets: Dict[Tuple[int, int], List[Dict[str, Any]]] = field(default_factory=dict)
+
+    def find(self, sig: int) -> Optional[Dict[str, Any]]:
+        """Return an indexed entry within MAX_DISTANCE bits of `sig`, if any."""
+        for key in _bands(sig):
+            for other in self._buckets.get(key, ()):
+                if bin(other["simhash"] ^ sig).count("1") <= MAX_DISTANCE:
+                    return other
+        return None
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        for key in _bands(entry["simhash"]):
+            self._buckets.setdefault(key, []).append(entry)
+
+    def remove(self, entry: Dict[str, Any]) -> None:
+        for key in _bands(entry["simhash"]):
+            bucket = self._buckets.get(key)
+            if not bucket:
+                continue
+            bucket[:] = [e for e in bucket if e is not entry]
+            if not bucket:
+                del self._buckets[key]
+
+    def remove_many(self, entries: List[Dict[str, Any]]) -> None:
+        """Remove several entries, filtering each affected bucket once."""
+        ids = {id(e) for e in entries}
+        for key in {key for e in entries for key in _bands(e["simhash"])}:
+            bucket = self._buckets.get(key)
+            if not bucket:
+                continue
+            bucket[:] = [e for e in bucket if id(e) not in ids]
+            if not bucket:
+                del self._buckets[key]
+
+    def clear(self) -> None:
+        self._buckets.clear()
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import pstats
+import signal
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_SECONDS = 30
+TRACE_FRAMES = 10
+
+
+@dataclass
+class Profiler:
+    """On-demand cProfile + tracemalloc capture for a running instance.
+
+    A session profiles the thread it is started on (the Tk thread: event loop
+    callbacks, clipboard polling, list refreshes) for a number of seconds and
+    diffs tracemalloc snapshots taken at start and end. Reports are written to
+    `out_dir`. `schedule` is Tk's after(ms, callback); `stats` returns a few
+    numbers about the history to put in the report.
+    """
+
+    out_dir: Path
+    schedule: Callable[[int, Callable[[], None]], Any]
+    stats: Callable[[], Dict[str, Any]] = dict
+    _profile: Optional[cProfile.Profile] = None
+    _mem_start: Optional[tracemalloc.Snapshot] = None
+    _stats_start: Optional[Dict[str, Any]] = None
+    _started_tracemalloc: bool = False
+    # Baseline for snapshot_memory(): set when it starts tracing, then after every report
+    _snap_base: Optional[tracemalloc.Snapshot] = None
+    _snap_stats: Optional[Dict[str, Any]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._profile is not None
+
+    def start(self, seconds: int = DEFAULT_SECONDS, on_done: Optional[Callable[[List[Path]], None]] = None) -> Optional[str]:
+        """Begin a session; returns an error message if one is already running."""
+        if self.running:
+            return "A profile is already being recorded"
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+            self._started_tracemalloc = True
+        self._mem_start = tracemalloc.take_snapshot()
+        self._stats_start = self.stats()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+        def finish() -> None:
+            paths = self._finish()
+            if on_done is not None:
+                on_done(paths)
+
+        self.schedule(max(1, seconds) * 1000, finish)
+        return None
+
+    def _finish(self) -> List[Path]:
+        prof, self._profile = self._profile, None
+        if prof is None:
+            return []
+        prof.disable()
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+
+        prof_path = self.out_dir / f"cpu-{stamp}.prof"
+        prof.dump_stats(str(prof_path))
+        buf = io.StringIO()
+        pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(60)
+        txt_path = self.out_dir / f"cpu-{stamp}.txt"
+        txt_path.write_text(buf.getvalue(), encoding="utf-8")
+
+        mem_path = self._write_memory(stamp, self._mem_start, self._stats_start)
+        self._mem_start = self._stats_start = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+            self._snap_base = self._snap_stats = None
+        return [prof_path, txt_path, mem_path]
+
+    def snapshot_memory(self) -> Optional[Path]:
+        """Write allocations and their growth since the previous call (no session needed).
+
+        tracemalloc only sees allocations made after it starts, so if it isn't
+        running yet this call just starts it and returns None; the next call
+        writes the report, diffed against that starting point.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+            self._snap_base, self._snap_stats = tracemalloc.take_snapshot(), self.stats()
+            return None
+        path = self._write_memory(datetime.now().strftime("%Y%m%d-%H%M%S"), self._snap_base, self._snap_stats)
+        self._snap_base, self._snap_stats = tracemalloc.take_snapshot(), self.stats()
+        return path
+
+    def _write_memory(
+        self, stamp: str, baseline: Optional[tracemalloc.Snapshot], stats_before: Optional[Dict[str, Any]]
+    ) -> Path:
+        snap = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>")]
+        )
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"traced memory: current={current} peak={peak}"]
+        stats_now = self.stats()
+        for k, v in stats_now.items():
+            before = (stats_before or {}).get(k)
+            lines.append(f"{k}: {v}" if before is None else f"{k}: {before} -> {v}")
+
+        if baseline is not None:
+            lines.append("\nTop growth since the baseline snapshot:")
+            for stat in snap.compare_to(baseline, "lineno")[:25]:
+                lines.append(str(stat))
+        lines.append("\nTop allocations:")
+        for stat in snap.statistics("lineno")[:25]:
+            lines.append(str(stat))
+        lines.append("\nLargest allocation stacks:")
+        for stat in snap.statistics("traceback")[:3]:
+            lines.append(f"{stat.count} blocks, {stat.size} bytes")
+            lines.extend("  " + ln for ln in stat.traceback.format())
+
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        path = self.out_dir / f"mem-{stamp}.txt"
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return path
+
+    def install_signal_handlers(
+        self,
+        on_done: Optional[Callable[[List[Path]], None]] = None,
+        on_armed: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """SIGUSR1 starts a session, SIGUSR2 writes a memory snapshot.
+
+        The first SIGUSR2 only starts tracing allocations (then `on_armed` is
+        called); each later one writes the growth since the one before.
+
+        Handlers only queue work on the Tk loop; nothing heavy runs inside the handler.
+        """
+        if not hasattr(signal, "SIGUSR1"):
+            return
+
+        def on_usr1(_signum, _frame) -> None:
+            self.schedule(0, lambda: self.start(on_done=on_done))
+
+        def snapshot() -> None:
+            path = self.snapshot_memory()
+            if path is None:
+                if on_armed is not None:
+                    on_armed()
+            elif on_done is not None:
+                on_done([path])
+
+        def on_usr2(_signum, _frame) -> None:
+            self.schedule(0, snapshot)
+
+        signal.signal(signal.SIGUSR1, on_usr1)
+        signal.signal(signal.SIGUSR2, on_usr2)
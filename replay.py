@@ -0,0 +1,170 @@
+"""Replay a clipboard trace through the capture pipeline without a display.
+
+    python3 replay.py clipboard-trace.jsonl --speed 10
+    python3 replay.py --synthetic 1000 --rate 200 --poll-ms 50
+
+A producer thread sets a fake clipboard at the (scaled) trace times while the
+main thread polls it the way the app's Tk timer does, including the history
+write after each capture. Reports dropped captures, capture latency and
+persistence throughput.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from capture import CapturePipeline
+from cliptrace import load_trace, synthetic_trace
+from history import History
+from storage import save_history
+
+
+def _fake_text(ev: Dict[str, Any]) -> str:
+    # Same hash -> same text, so re-copies hit the duplicate index as they did live
+    digest = ev["hash"]
+    size = max(int(ev.get("size", 0)), len(digest))
+    reps = size // (len(digest) + 1) + 1
+    return (digest + " ") * reps if size > len(digest) else digest
+
+
+@dataclass
+class FakeClipboard:
+    text: str = ""
+    set_at: float = 0.0
+    event_index: int = -1
+    # What the last read() returned, so a capture can be matched to its trace event
+    read_index: int = -1
+    read_set_at: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def set(self, text: str, index: int) -> None:
+        with self.lock:
+            self.text, self.set_at, self.event_index = text, time.perf_counter(), index
+
+    def read(self) -> Tuple[Optional[str], Optional[str]]:
+        with self.lock:
+            self.read_index, self.read_set_at = self.event_index, self.set_at
+            return self.text, None
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def replay(
+    events: List[Dict[str, Any]],
+    speed: float = 1.0,
+    poll_ms: int = 500,
+    max_items: int = 500,
+    max_mb: int = 64,
+    persist_dir: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """Drive CapturePipeline from `events`; returns a metrics dict."""
+    clip = FakeClipboard()
+    history = History(max_items=max_items, max_bytes=max_mb * 1024 * 1024)
+
+    with tempfile.TemporaryDirectory(prefix="copy2-replay-") as tmp:
+        out_path = (persist_dir or Path(tmp)) / "history.json"
+        saves: List[float] = []
+        written = [0]
+
+        def persist(entries: List[Dict[str, Any]]) -> None:
+            t0 = time.perf_counter()
+            save_history(entries, out_path)
+            saves.append(time.perf_counter() - t0)
+            written[0] += out_path.stat().st_size
+
+        pipeline = CapturePipeline(history=history, persist=persist, read=clip.read, backend=lambda: "fake")
+        pipeline.seed()
+
+        t_first = events[0]["t"] if events else 0.0
+        done = threading.Event()
+
+        def produce() -> None:
+            start = time.perf_counter()
+            for i, ev in enumerate(events):
+                due = start + (ev["t"] - t_first) / speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                clip.set(_fake_text(ev), i)
+            done.set()
+
+        producer = threading.Thread(target=produce, name="replay-producer", daemon=True)
+        captured: Dict[int, float] = {}
+        wall0 = time.perf_counter()
+        producer.start()
+
+        while True:
+            finished = done.is_set()
+            capture, _err = pipeline.poll()
+            if capture is not None and clip.read_index >= 0:
+                captured[clip.read_index] = (time.perf_counter() - clip.read_set_at) * 1000.0
+            if finished:
+                break
+            time.sleep(poll_ms / 1000.0)
+
+        wall = time.perf_counter() - wall0
+        producer.join()
+
+    latencies = list(captured.values())
+    total_save = sum(saves)
+    return {
+        "events": len(events),
+        "captured": len(captured),
+        "dropped": len(events) - len(captured),
+        "drop_rate": (len(events) - len(captured)) / len(events) if events else 0.0,
+        "latency_ms_p50": _percentile(latencies, 50),
+        "latency_ms_p95": _percentile(latencies, 95),
+        "latency_ms_max": max(latencies) if latencies else 0.0,
+        "saves": len(saves),
+        "save_ms_avg": (total_save / len(saves) * 1000.0) if saves else 0.0,
+        "saves_per_s": (len(saves) / total_save) if total_save else 0.0,
+        "persist_mb_per_s": (written[0] / total_save / (1024 * 1024)) if total_save else 0.0,
+        "history_items": len(history),
+        "history_bytes": history.total_bytes,
+        "wall_s": wall,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Replay a Copy2 clipboard trace headlessly.")
+    ap.add_argument("trace", nargs="?", type=Path, help="trace file (JSON lines) recorded by Copy2")
+    ap.add_argument("--synthetic", type=int, default=0, metavar="N", help="generate N copies instead of reading a trace")
+    ap.add_argument("--rate", type=float, default=100.0, help="copies per second for --synthetic")
+    ap.add_argument("--size", type=int, default=200, help="clip size in chars for --synthetic")
+    ap.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier")
+    ap.add_argument("--poll-ms", type=int, default=500, help="poll interval, as in Settings")
+    ap.add_argument("--max-items", type=int, default=500)
+    ap.add_argument("--max-mb", type=int, default=64)
+    ap.add_argument("--json", action="store_true", help="print metrics as JSON")
+    args = ap.parse_args(argv)
+
+    if args.synthetic:
+        events = synthetic_trace(args.synthetic, args.rate, args.size)
+    elif args.trace:
+        events = load_trace(args.trace)
+    else:
+        ap.error("give a trace file or --synthetic N")
+
+    metrics = replay(events, args.speed, args.poll_ms, args.max_items, args.max_mb)
+    if args.json:
+        print(json.dumps(metrics, indent=2))
+    else:
+        for k, v in metrics.items():
+            print(f"{k:>18}: {v:.3f}" if isinstance(v, float) else f"{k:>18}: {v}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import atexit
+import glob
+import mmap
+import multiprocessing
+import os
+import tempfile
+import threading
+from array import array
+from bisect import bisect_right
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# on_results(batch, reset, done): `reset` means "replace what you have", `done` means no more batches follow.
+ResultsCallback = Callable[[List[int], bool, bool], None]
+
+
+def _matches(text: str, term: str) -> bool:
+    return term in text.lower()
+
+
+# ---------------- Multi-process scanning ----------------
+def _scan_shard(path: str, count: int, start: int, end: int, needle: bytes) -> List[int]:
+    """Return indexes in [start, end) whose text contains `needle` (runs in a pool worker).
+
+    A query only ships the needle; the worker maps the shared corpus for the
+    duration of the task. Mapping is lazy and cheap, and holding no mapping
+    between tasks lets tmpfs free a replaced corpus right away.
+    """
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return _scan_mapped(mm, count, start, end, needle)
+
+
+def _scan_mapped(mm: mmap.mmap, count: int, start: int, end: int, needle: bytes) -> List[int]:
+    offs = array("q")
+    offs.frombytes(mm[start * 8 : (end + 1) * 8])
+    base = (count + 1) * 8
+    hi = base + offs[-1]
+    found: List[int] = []
+    pos = base + offs[0]
+    while True:
+        p = mm.find(needle, pos, hi)
+        if p < 0:
+            return found
+        # Entries are NUL-separated and the needle has no NUL, so a hit can't span two entries
+        k = bisect_right(offs, p - base) - 1
+        found.append(start + k)
+        pos = base + offs[k + 1]
+
+
+CORPUS_PREFIX = "copy2-corpus-"
+
+
+def _corpus_dir() -> str:
+    return "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # EPERM: it exists, it just isn't ours
+        return True
+    return True
+
+
+def remove_stale_corpora() -> int:
+    """Delete corpus files left by instances that died without cleaning up (SIGTERM, crash).
+
+    tmpfs keeps them until reboot otherwise. File names carry the owner's PID.
+    Returns how many were removed.
+    """
+    removed = 0
+    for path in glob.glob(os.path.join(_corpus_dir(), CORPUS_PREFIX + "*")):
+        pid = os.path.basename(path)[len(CORPUS_PREFIX) :].split("-", 1)[0]
+        if pid.isdigit() and _pid_alive(int(pid)):
+            continue
+        try:
+            os.unlink(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+class SharedCorpus:
+    """Lower-cased history text laid out once in a memory-mapped file for pool workers.
+
+    Layout: (count + 1) int64 offsets, then each entry's UTF-8 bytes followed by a NUL.
+    The file lives in /dev/shm when available, so it never touches the disk.
+    """
+
+    def __init__(self, texts: Sequence[str], key: Tuple[str, ...]):
+        self.key = key
+        self.count = len(texts)
+        fd, self.path = tempfile.mkstemp(prefix=f"{CORPUS_PREFIX}{os.getpid()}-", dir=_corpus_dir())
+        # Normal exits clean up here; anything harsher is swept by the next start
+        atexit.register(self.close)
+        offsets = array("q", [0])
+        with os.fdopen(fd, "wb") as fh:
+            fh.seek((self.count + 1) * 8)
+            total = 0
+            for t in texts:
+                b = t.lower().encode("utf-8", "surrogatepass")
+                fh.write(b)
+                fh.write(b"\0")
+                total += len(b) + 1
+                offsets.append(total)
+            fh.seek(0)
+            fh.write(offsets.tobytes())
+        self.offsets = offsets
+
+    def shards(self, n: int) -> List[Tuple[int, int]]:
+        """Split entries into up to `n` contiguous ranges of roughly equal bytes."""
+        total = self.offsets[-1]
+        bounds = [0]
+        for s in range(1, n):
+            i = bisect_right(self.offsets, total * s // n)
+            if bounds[-1] < i < self.count:
+                bounds.append(i)
+        bounds.append(self.count)
+        return list(zip(bounds, bounds[1:]))
+
+    def close(self) -> None:
+        atexit.unregister(self.close)
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+# ---------------- Controller ----------------
+@dataclass
+class SearchController:
+    """Substring search over history entries that never blocks the UI thread.
+
+    Candidates holding little text are filtered inline; what blocks the Tk loop is
+    lower-casing and scanning text, not the entry count (the history holds at most
+    500). Anything more is scanned on a worker thread in slices of `slice_size`
+    entries or a few MB of text; each slice is streamed back through `schedule`
+    (e.g. Tk's after(0, ...)) and a newer search cancels the running one between
+    slices.
+    When the new term contains the previous one, only the previous matches are
+    rescanned. Call invalidate() whenever the history itself changes.
+
+    Full scans over at least `parallel_min_chars` of text are sharded across a
+    process pool instead; the corpus is written to shared memory once per
+    history state and reused by every query until the history changes. Each
+    worker is a whole interpreter, so the pool is small and both it and the
+    corpus are released after `pool_idle_s` without a parallel query.
+    """
+
+    schedule: Callable[[Callable[[], None]], None]
+    slice_size: int = 100
+    # Below this much text a scan is quicker than handing it to a thread
+    inline_max_chars: int = 256 * 1024
+    parallel_min_chars: int = 16 * 1024 * 1024
+    workers: int = min(os.cpu_count() or 1, 4)
+    pool_idle_s: float = 60.0
+    _token: int = 0
+    _last_term: str = ""
+    _last_result: Optional[List[int]] = None
+    _last_window: Optional[Tuple[int, int]] = None
+    _pool: Optional[ProcessPoolExecutor] = None
+    _corpus: Optional[SharedCorpus] = None
+    _corpus_lock: Optional[threading.Lock] = None
+    _pool_busy: int = 0
+    _pool_gen: int = 0
+    _idle_timer: Optional[threading.Timer] = None
+
+    def invalidate(self) -> None:
+        self._last_term = ""
+        self._last_result = None
+
+    def cancel(self) -> None:
+        self._token += 1
+
+    def close(self) -> None:
+        """Stop the worker pool and drop the shared corpus."""
+        self.cancel()
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+        self._release()
+
+    def _release(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if self._corpus is not None:
+            self._corpus.close()
+            self._corpus = None
+
+    def _release_if_idle(self, gen: int) -> None:
+        with self._corpus_lock:
+            if gen == self._pool_gen and not self._pool_busy:
+                self._release()
+
+    def _arm_idle_timer(self) -> None:
+        # Called with _corpus_lock held
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+        self._idle_timer = threading.Timer(self.pool_idle_s, self._release_if_idle, args=(self._pool_gen,))
+        self._idle_timer.daemon = True
+        self._idle_timer.start()
+
+    def search(
+        self,
+        history: Sequence[Dict[str, Any]],
+        term: str,
+        on_results: ResultsCallback,
+        window: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        """Search `history`, optionally only entries[lo:hi] for window=(lo, hi)."""
+        self._token += 1
+        token = self._token
+        term = term.strip().lower()
+        # Atomic under the GIL; the worker never sees a list that's being mutated
+        snapshot = list(history)
+        lo, hi = window if window is not None else (0, len(snapshot))
+        if window != self._last_window:
+            self.invalidate()
+            self._last_window = window
+
+        if not term:
+            self._last_term, self._last_result = "", list(range(lo, hi))
+            on_results(list(self._last_result), True, True)
+            return
+
+        narrowed = self._last_result is not None and bool(self._last_term) and self._last_term in term
+        candidates = self._last_result if narrowed else range(lo, hi)
+        chars = sum(len(snapshot[i]["text"]) for i in candidates)
+
+        def finish(found: List[int]) -> None:
+            if token != self._token:
+                return
+            self._last_term, self._last_result = term, found
+
+        if chars <= self.inline_max_chars:
+            found = [i for i in candidates if _matches(snapshot[i]["text"], term)]
+            finish(found)
+            on_results(list(found), True, True)
+            return
+
+        def deliver(batch: List[int], reset: bool, done: bool, found: List[int]) -> None:
+            if token != self._token:
+                return
+            if done:
+                finish(found)
+            on_results(batch, reset, done)
+
+        def stream(batches) -> None:
+            found: List[int] = []
+            first = True
+            for batch, last in batches:
+                if token != self._token:
+                    return
+                found.extend(batch)
+                if batch or first or last:
+                    self.schedule(lambda b=batch, r=first, d=last: deliver(b, r, d, found))
+                    first = False
+
+        def sliced():
+            # Flush by entry count or by text volume, whichever comes first
+            batch: List[int] = []
+            volume = 0
+            for n, i in enumerate(candidates):
+                text = snapshot[i]["text"]
+                if _matches(text, term):
+                    batch.append(i)
+                volume += len(text)
+                last = n == len(candidates) - 1
+                if last or len(batch) >= self.slice_size or volume >= self.inline_max_chars * 16:
+                    yield batch, last
+                    if token != self._token:
+                        return
+                    batch, volume = [], 0
+
+        use_pool = not narrowed and window is None and chars >= self.parallel_min_chars and self.workers > 1 and "\0" not in term
+
+        def work() -> None:
+            if use_pool:
+                try:
+                    stream(self._parallel(snapshot, term, token))
+                    return
+                except Exception:
+                    if token != self._token:
+                        return
+                    # Pool unavailable (sandbox, fork limits...): scan here instead
+            stream(sliced())
+
+        threading.Thread(target=work, name="copy2-search", daemon=True).start()
+
+    def _parallel(self, snapshot: List[Dict[str, Any]], term: str, token: int):
+        """Yield (batch, last) per shard, in history order, from the process pool."""
+        if self._corpus_lock is None:
+            self._corpus_lock = threading.Lock()
+        key = tuple(e.get("hash") or str(id(e)) for e in snapshot)
+        with self._corpus_lock:
+            corpus = self._corpus
+            if corpus is None or corpus.key != key:
+                corpus = SharedCorpus([e["text"] for e in snapshot], key)
+                if self._corpus is not None:
+                    self._corpus.close()
+                self._corpus = corpus
+            if self._pool is None:
+                # spawn, not fork: forking a process that runs Tk and other threads is unsafe
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            pool = self._pool
+            self._pool_busy += 1
+            self._pool_gen += 1
+
+        needle = term.encode("utf-8", "surrogatepass")
+        shards = corpus.shards(self.workers * 2)
+        futures: List[Future] = []
+        try:
+            for start, end in shards:
+                futures.append(pool.submit(_scan_shard, corpus.path, corpus.count, start, end, needle))
+            for n, fut in enumerate(futures):
+                if token != self._token:
+                    return
+                yield fut.result(), n == len(futures) - 1
+        finally:
+            for fut in futures:
+                fut.cancel()
+            with self._corpus_lock:
+                self._pool_busy -= 1
+                self._arm_idle_timer()
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+_APP_DIR = str(Path(__file__).resolve().parent)
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def _culprit(stack: traceback.StackSummary) -> str:
+    """Innermost frame in Copy2's own code (what we can fix), else the innermost frame."""
+    for frame in reversed(stack):
+        if frame.filename.startswith(_APP_DIR):
+            return f"{Path(frame.filename).name}:{frame.lineno} {frame.name}"
+    if stack:
+        frame = stack[-1]
+        return f"{Path(frame.filename).name}:{frame.lineno} {frame.name}"
+    return "unknown"
+
+
+@dataclass
+class StallWatchdog:
+    """Detects Tk event-loop stalls and records what the main thread was doing.
+
+    The Tk loop bumps a heartbeat every `tick_ms` via `schedule` (Tk's after).
+    A background thread checks the heartbeat; once it is `threshold_ms` late,
+    it grabs the main thread's stack with sys._current_frames(). When the loop
+    comes back, the stall's length, culprit function and stack go to a
+    rotating log and into the running summary.
+    """
+
+    schedule: Callable[[int, Callable[[], None]], Any]
+    log_path: Path
+    threshold_ms: int = 250
+    tick_ms: int = 100
+    _last_beat: float = 0.0
+    _stack: Optional[traceback.StackSummary] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+    _stop: threading.Event = field(default_factory=threading.Event)
+    _durations: Deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+    _culprits: Counter = field(default_factory=Counter)
+    _count: int = 0
+    _logger: Optional[logging.Logger] = None
+    _thread: Optional[threading.Thread] = None
+    # Bumped on every start so heartbeats and threads from a previous run retire
+    _gen: int = 0
+
+    def start(self) -> None:
+        if self._thread is not None or self.threshold_ms <= 0:
+            return
+        self._logger = logging.getLogger("copy2.stalls")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        if not self._logger.handlers:
+            handler = RotatingFileHandler(self.log_path, maxBytes=1024 * 1024, backupCount=3, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self._logger.addHandler(handler)
+
+        self._gen += 1
+        self._stop = threading.Event()
+        self._last_beat = time.perf_counter()
+        main_id = threading.main_thread().ident
+        self._thread = threading.Thread(
+            target=self._watch, args=(main_id, self._stop), name="copy2-watchdog", daemon=True
+        )
+        self._thread.start()
+        gen = self._gen
+        self.schedule(self.tick_ms, lambda: self._beat(gen))
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread = None
+        if self._logger is not None and self._count:
+            self._logger.info("summary %s", self.summary_text())
+
+    def _beat(self, gen: int) -> None:
+        if self._thread is None or gen != self._gen:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            late_ms = (now - self._last_beat) * 1000.0 - self.tick_ms
+            stack, self._stack = self._stack, None
+            self._last_beat = now
+        if late_ms >= self.threshold_ms:
+            self._record(late_ms, stack)
+        self.schedule(self.tick_ms, lambda: self._beat(gen))
+
+    def _watch(self, main_id: Optional[int], stop: threading.Event) -> None:
+        interval = max(0.01, self.threshold_ms / 4000.0)
+        while not stop.wait(interval):
+            with self._lock:
+                late_ms = (time.perf_counter() - self._last_beat) * 1000.0 - self.tick_ms
+                if late_ms < self.threshold_ms or self._stack is not None:
+                    continue
+            frame = sys._current_frames().get(main_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            with self._lock:
+                self._stack = stack
+
+    def _record(self, late_ms: float, stack: Optional[traceback.StackSummary]) -> None:
+        # A stall that ended before the watchdog looked has no stack; still count it
+        culprit = _culprit(stack) if stack else "unknown (ended before sampling)"
+        self._count += 1
+        self._durations.append(late_ms)
+        self._culprits[culprit] += 1
+        if self._logger is not None:
+            detail = "".join(stack.format()) if stack else ""
+            self._logger.info("stall %.0f ms in %s\n%s", late_ms, culprit, detail)
+
+    def summary(self) -> Dict[str, Any]:
+        ordered = sorted(self._durations)
+        return {
+            "stalls": self._count,
+            "p50_ms": _percentile(ordered, 50),
+            "p95_ms": _percentile(ordered, 95),
+            "max_ms": ordered[-1] if ordered else 0.0,
+            "top": self._culprits.most_common(3),
+        }
+
+    def summary_text(self) -> str:
+        s = self.summary()
+        if not s["stalls"]:
+            return "No UI stalls recorded"
+        top = ", ".join(f"{name} ×{n}" for name, n in s["top"])
+        return f"{s['stalls']} stalls, p50 {s['p50_ms']:.0f} ms, p95 {s['p95_ms']:.0f} ms, max {s['max_ms']:.0f} ms; top: {top}"
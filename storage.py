@@ -1,19 +1,33 @@
 from __future__ import annotations
 
 import json
+import time
 from dataclasses import dataclass, field
 from datetime import datetime
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 from platformdirs import user_config_dir, user_data_dir
 
+from history import content_hash
+
 APP_NAME = "Copy2"
 APP_AUTHOR = "MellowLabs"
 
 
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
 def _now_ts() -> str:
-    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return datetime.now().strftime(TIME_FORMAT)
+
+
+def _parse_ts(value: str) -> Optional[float]:
+    try:
+        return datetime.strptime(value, TIME_FORMAT).timestamp()
+    except (TypeError, ValueError):
+        return None
 
 
 def get_dirs() -> Tuple[Path, Path]:
@@ -35,6 +49,21 @@ def history_path() -> Path:
     return data_dir / "history.json"
 
 
+def trace_path() -> Path:
+    _, data_dir = get_dirs()
+    return data_dir / "clipboard-trace.jsonl"
+
+
+def stall_log_path() -> Path:
+    _, data_dir = get_dirs()
+    return data_dir / "stalls.log"
+
+
+def profiles_dir() -> Path:
+    _, data_dir = get_dirs()
+    return data_dir / "profiles"
+
+
 DEFAULT_HOTKEYS: Dict[str, str] = {
     "paste_reversed": "ctrl+alt+v",
     "cycle_back": "ctrl+alt+up",
@@ -48,9 +77,14 @@ DEFAULT_HOTKEYS: Dict[str, str] = {
 @dataclass
 class Config:
     max_history: int = 20
+    # Retention budget for history text + formats, in memory and therefore on disk
+    max_history_mb: int = 64
     poll_interval_ms: int = 500
     enable_hotkeys: bool = False
     send_paste: bool = False
+    record_trace: bool = False
+    # UI stalls longer than this are logged with the blocking stack; 0 turns the watchdog off
+    stall_threshold_ms: int = 250
     hotkeys: Dict[str, str] = field(default_factory=lambda: dict(DEFAULT_HOTKEYS))
     favorites: List[str] = field(default_factory=list)
 
@@ -78,9 +112,14 @@ def load_config() -> Config:
         return cfg
 
     cfg.max_history = _coerce_int(raw.get("max_history", cfg.max_history), cfg.max_history, 1, 500)
+    cfg.max_history_mb = _coerce_int(raw.get("max_history_mb", cfg.max_history_mb), cfg.max_history_mb, 1, 4096)
     cfg.poll_interval_ms = _coerce_int(raw.get("poll_interval_ms", cfg.poll_interval_ms), cfg.poll_interval_ms, 100, 5000)
     cfg.enable_hotkeys = bool(raw.get("enable_hotkeys", cfg.enable_hotkeys))
     cfg.send_paste = bool(raw.get("send_paste", cfg.send_paste))
+    cfg.record_trace = bool(raw.get("record_trace", cfg.record_trace))
+    cfg.stall_threshold_ms = _coerce_int(
+        raw.get("stall_threshold_ms", cfg.stall_threshold_ms), cfg.stall_threshold_ms, 0, 10000
+    )
 
     hotkeys = raw.get("hotkeys")
     if isinstance(hotkeys, dict):
@@ -105,16 +144,19 @@ def save_config(cfg: Config) -> None:
     path = config_path()
     data = {
         "max_history": cfg.max_history,
+        "max_history_mb": cfg.max_history_mb,
         "poll_interval_ms": cfg.poll_interval_ms,
         "enable_hotkeys": cfg.enable_hotkeys,
         "send_paste": cfg.send_paste,
+        "record_trace": cfg.record_trace,
+        "stall_threshold_ms": cfg.stall_threshold_ms,
         "hotkeys": cfg.hotkeys,
         "favorites": cfg.favorites,
     }
     path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
 
 
-def load_history(max_items: int) -> List[Dict[str, str]]:
+def load_history(max_items: int) -> List[Dict[str, Any]]:
     path = history_path()
     if not path.exists():
         return []
@@ -126,20 +168,169 @@ def load_history(max_items: int) -> List[Dict[str, str]]:
     if not isinstance(items, list):
         return []
 
-    cleaned: List[Dict[str, str]] = []
-    for it in items[-max_items:]:
-        if isinstance(it, dict) and isinstance(it.get("text"), str):
-            cleaned.append({
-                "time": str(it.get("time", "")) or _now_ts(),
-                "text": it["text"],
-            })
+    cleaned: List[Dict[str, Any]] = []
+    for it in unpack_history(items)[-max_items:]:
+        entry = clean_entry(it, _now_ts())
+        if entry is not None:
+            cleaned.append(entry)
     return cleaned
 
 
-def save_history(items: List[Dict[str, str]]) -> None:
-    path = history_path()
-    path.write_text(json.dumps(items, ensure_ascii=False, indent=2), encoding="utf-8")
-
-
-def make_entry(text: str) -> Dict[str, str]:
-    return {"time": _now_ts(), "text": text}
+def clean_entry(raw: Any, fallback_time: str = "") -> Optional[Dict[str, Any]]:
+    """Validate one stored/imported history item; returns None if unusable.
+
+    Besides "time" and "text", an entry may carry the clipboard "targets" seen at
+    capture time, the richer "formats" (target -> data) fetched for them and a
+    "uses" count of how often the clip was captured. The content "hash" is not
+    trusted from disk; the history recomputes it. "ts" is the numeric (epoch)
+    timestamp; older files only have "time", so it is parsed from that, and left
+    out when unknown for the history to fill in. `fallback_time` only fills the
+    displayed "time"; it never becomes the entry's "ts".
+    """
+    if not isinstance(raw, dict) or not isinstance(raw.get("text"), str):
+        return None
+    entry: Dict[str, Any] = {
+        "time": str(raw.get("time", "")) or fallback_time,
+        "text": raw["text"],
+    }
+    targets = raw.get("targets")
+    if isinstance(targets, list):
+        entry["targets"] = [t for t in targets if isinstance(t, str)]
+    formats = raw.get("formats")
+    if isinstance(formats, dict):
+        entry["formats"] = {k: v for k, v in formats.items() if isinstance(k, str) and isinstance(v, str)}
+    if isinstance(raw.get("uses"), int) and raw["uses"] > 1:
+        entry["uses"] = raw["uses"]
+    if isinstance(raw.get("simhash"), int):
+        entry["simhash"] = raw["simhash"]
+    ts = raw.get("ts")
+    if isinstance(ts, (int, float)) and not isinstance(ts, bool):
+        entry["ts"] = float(ts)
+    else:
+        ts = _parse_ts(str(raw.get("time", "")))
+        if ts is not None:
+            entry["ts"] = ts
+    return entry
+
+
+def save_history(items: List[Dict[str, Any]], path: Optional[Path] = None) -> None:
+    path = path or history_path()
+    path.write_text(json.dumps(_pack_history(items), ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+# ---- near-duplicate delta encoding ----
+# Entries sharing a "group" are stored as line deltas against the first member written:
+# {"base": <index of that member in the file>, "delta": [[i1, i2] | "inserted text", ...], "hash": ...}
+
+# Encoded deltas by (base hash, text hash), bounded by the bytes of inserted text they hold
+_DELTA_CACHE_BYTES = 4 * 1024 * 1024
+_delta_cache: "OrderedDict[Tuple[str, str], Tuple[Tuple[Any, ...], int]]" = OrderedDict()
+_delta_cache_bytes = 0
+
+
+def _encode_delta(base: str, text: str) -> Tuple[Any, ...]:
+    """Line delta of `text` against `base` in one linear pass.
+
+    Each line of `text` is looked up in a hash of `base`'s lines and matching
+    runs are extended greedily. Not a minimal diff, but it costs O(lines) on
+    the Tk thread where SequenceMatcher's cost grows much faster than that.
+    """
+    a = base.splitlines(keepends=True)
+    b = text.splitlines(keepends=True)
+    first: Dict[str, int] = {}
+    for i, line in enumerate(a):
+        first.setdefault(line, i)
+    ops: List[Any] = []
+    pending: List[str] = []
+    j = 0
+    while j < len(b):
+        i = first.get(b[j])
+        if i is None:
+            pending.append(b[j])
+            j += 1
+            continue
+        if pending:
+            ops.append("".join(pending))
+            pending = []
+        start = i
+        while j < len(b) and i < len(a) and a[i] == b[j]:
+            i += 1
+            j += 1
+        if ops and not isinstance(ops[-1], str) and ops[-1][1] == start:
+            ops[-1][1] = i
+        else:
+            ops.append([start, i])
+    if pending:
+        ops.append("".join(pending))
+    return tuple(ops)
+
+
+def _cached_delta(base: Dict[str, Any], entry: Dict[str, Any]) -> Tuple[Any, ...]:
+    global _delta_cache_bytes
+    key = (base.get("hash") or content_hash(base["text"]), entry.get("hash") or content_hash(entry["text"]))
+    hit = _delta_cache.get(key)
+    if hit is not None:
+        _delta_cache.move_to_end(key)
+        return hit[0]
+    ops = _encode_delta(base["text"], entry["text"])
+    size = sum(len(op) if isinstance(op, str) else 8 for op in ops)
+    if size <= _DELTA_CACHE_BYTES:
+        _delta_cache[key] = (ops, size)
+        _delta_cache_bytes += size
+        while _delta_cache_bytes > _DELTA_CACHE_BYTES:
+            _key, (_ops, old) = _delta_cache.popitem(last=False)
+            _delta_cache_bytes -= old
+    return ops
+
+
+def _apply_delta(base: str, ops: List[Any]) -> str:
+    a = base.splitlines(keepends=True)
+    out: List[str] = []
+    for op in ops:
+        if isinstance(op, str):
+            out.append(op)
+        else:
+            out.extend(a[op[0] : op[1]])
+    return "".join(out)
+
+
+def _pack_history(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    bases: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+    packed: List[Dict[str, Any]] = []
+    for it in items:
+        rec = {k: v for k, v in it.items() if k != "group"}
+        group = it.get("group")
+        if group and group in bases:
+            base_index, base = bases[group]
+            ops = _cached_delta(base, it)
+            # Only worth it if the delta is clearly smaller than the text
+            if sum(len(op) if isinstance(op, str) else 8 for op in ops) < len(it["text"]) * 0.8:
+                del rec["text"]
+                rec["base"] = base_index
+                rec["delta"] = list(ops)
+                rec["hash"] = it.get("hash") or content_hash(it["text"])
+        elif group:
+            bases[group] = (len(packed), it)
+        packed.append(rec)
+    return packed
+
+
+def unpack_history(items: List[Any]) -> List[Any]:
+    out: List[Any] = []
+    for it in items:
+        if isinstance(it, dict) and "delta" in it and "text" not in it:
+            try:
+                base = items[it["base"]]["text"]
+                text = _apply_delta(base, it["delta"])
+            except Exception:
+                continue
+            # A corrupt delta would silently yield the wrong clip; drop it instead
+            if content_hash(text) != it.get("hash"):
+                continue
+            it = dict(it, text=text)
+        out.append(it)
+    return out
+
+
+def make_entry(text: str) -> Dict[str, Any]:
+    return {"time": _now_ts(), "ts": time.time(), "text": text}
@@ -0,0 +1,140 @@
+from history import Batch, History, entry_bytes
+
+
+def _entry(text, ts):
+    return {"time": "", "ts": float(ts), "text": text}
+
+
+def _clip(tag, size):
+    # A single long token: too short for a SimHash, so no near-duplicate grouping
+    return tag + "x" * size
+
+
+def _assert_consistent(h):
+    """Byte total, sorted ts mirror and range queries all agree with the entries."""
+    ts = [e["ts"] for e in h]
+    assert h._ts == ts == sorted(ts)
+    assert h.total_bytes == sum(entry_bytes(e) for e in h)
+    assert all(h.contains(e) and h.find(e) is e for e in h)
+    for start, end in [(float("-inf"), float("inf"))] + [(t, t + 0.5) for t in ts]:
+        assert h.range_indexes(start, end) == (sum(t < start for t in ts), sum(t < end for t in ts))
+
+
+def test_item_cap_evicts_oldest():
+    h = History(max_items=2, max_bytes=1 << 30)
+    entries = [_entry(f"clip {i}", i) for i in range(3)]
+    evicted = [e for x in entries for e in h.append(x)]
+    assert evicted == entries[:1]
+    assert list(h) == entries[1:]
+    _assert_consistent(h)
+
+
+def test_byte_budget_evicts_favorites_last():
+    h = History(max_items=50, max_bytes=1 << 30)
+    old, mid, new = (_entry(_clip(t, 1000), i) for i, t in enumerate("abc"))
+    for e in (old, mid, new):
+        h.append(e)
+    # Room for two of the three; the oldest is a favorite, so the next oldest goes
+    evicted = h.set_limits(50, entry_bytes(old) * 2 + 10, favorites=[old["text"]])
+    assert evicted == [mid]
+    assert list(h) == [old, new]
+    _assert_consistent(h)
+
+
+def test_too_large_clip_evicts_only_itself():
+    small = [_entry(_clip(t, 50), i) for i, t in enumerate("ab")]
+    h = History(max_items=50, max_bytes=sum(entry_bytes(e) for e in small) + 1000)
+    for e in small:
+        h.append(e)
+    big = _entry(_clip("big", 10_000), 5)
+    assert h.append(big) == [big]
+    assert list(h) == small
+    _assert_consistent(h)
+
+
+def test_recapture_moves_to_front_and_counts_use():
+    h = History(max_items=50, max_bytes=1 << 30)
+    a, b = _entry("alpha", 1), _entry("beta", 2)
+    h.append(a)
+    h.append(b)
+    assert h.append(_entry("alpha", 3)) == []
+    assert list(h) == [b, a]
+    assert a["uses"] == 2 and a["ts"] == 3.0
+    _assert_consistent(h)
+
+
+def test_recapture_of_newest_moves_its_ts_with_its_time():
+    h = History(max_items=50, max_bytes=1 << 30)
+    a = _entry("alpha", 1)
+    h.append(a)
+    h.append(dict(_entry("alpha", 7), time="2024-01-01 00:00:07"))
+    assert list(h) == [a]
+    assert a["uses"] == 2 and a["ts"] == 7.0 and a["time"] == "2024-01-01 00:00:07"
+    _assert_consistent(h)
+
+
+def test_loaded_duplicates_collapse_and_add_up_uses():
+    old = dict(_entry("alpha", 1), uses=2)
+    b = _entry("beta", 2)
+    new = _entry("alpha", 3)
+    h = History(max_items=50, max_bytes=1 << 30, entries=[old, b, new])
+    assert list(h) == [b, new]
+    assert new["uses"] == 3
+    _assert_consistent(h)
+
+
+LOG_LINE = "the service started worker pool with 8 threads on port 8080 at 10:00"
+
+
+def test_apply_batch_combines_changes_in_one_pass():
+    h = History(max_items=50, max_bytes=1 << 30)
+    e = [_entry(f"clip {i}", i) for i in range(4)]
+    near_old, near_new = _entry(LOG_LINE, 4), _entry(LOG_LINE.replace("8", "9"), 5)
+    for x in e + [near_old, near_new]:
+        h.append(x)
+    assert h.group_members(near_old) == [near_old, near_new]
+
+    result = h.apply_batch(
+        Batch(
+            delete=[e[1], e[3]],
+            move_to_front=[near_old, e[0], e[1]],
+            favorite=[e[2], e[2]],
+            unfavorite=[_entry("gone", 0)],
+            export=[e[1], e[2]],
+            time_str="2024-01-01 00:00:00",
+        ),
+        favorites=["gone", "kept"],
+    )
+
+    assert result.removed == [e[1], e[3]]
+    # Deletion wins over a move; moved entries keep their relative order
+    assert result.moved == [e[0], near_old]
+    assert list(h) == [e[2], near_new, e[0], near_old]
+    assert e[0]["time"] == "2024-01-01 00:00:00" and "uses" not in e[0]
+    assert h.group_members(near_old) == [near_new, near_old]
+    assert result.exported == [e[1], e[2]]
+    assert result.favorites == ["kept", e[2]["text"]] and result.favorites_changed
+    assert result.history_changed
+    assert not h.contains(e[1]) and h.find(e[3]) is None
+    _assert_consistent(h)
+
+
+def test_apply_batch_without_history_changes_leaves_history_alone():
+    h = History(max_items=50, max_bytes=1 << 30)
+    a = _entry("alpha", 1)
+    h.append(a)
+    result = h.apply_batch(Batch(export=[a], unfavorite=[a]), favorites=["other"])
+    assert result.exported == [a]
+    assert not result.history_changed and not result.favorites_changed
+    assert list(h) == [a]
+    _assert_consistent(h)
+
+
+def test_apply_batch_prunes_many_entries():
+    h = History(max_items=5000, max_bytes=1 << 30)
+    for i in range(3000):
+        h.append(_entry(f"clip {i}", i))
+    doomed = h.entries[::3]
+    result = h.apply_batch(Batch(delete=doomed))
+    assert len(result.removed) == 1000 and len(h) == 2000
+    _assert_consistent(h)
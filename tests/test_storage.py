@@ -0,0 +1,68 @@
+import json
+
+import storage
+from history import History, time_ranges
+from storage import _pack_history, unpack_history, make_entry
+
+LOG = "".join(f"2024-01-01 10:00:{i % 60:02d} worker {i} handled request ok\n" for i in range(400))
+
+
+def _history(*texts):
+    h = History(max_items=50, max_bytes=1 << 30)
+    for t in texts:
+        h.append(make_entry(t))
+    return h
+
+
+def test_pack_round_trip():
+    variant = LOG.replace("worker 7 ", "worker 7b ").replace("handled request ok\n", "handled request FAILED\n", 3)
+    h = _history(LOG, "unrelated clip", variant)
+    packed = _pack_history(h.entries)
+    assert "delta" in packed[2] and "text" not in packed[2]
+    assert packed[2]["base"] == 0
+    assert [e["text"] for e in unpack_history(packed)] == [e["text"] for e in h]
+
+
+def test_corrupt_delta_is_dropped():
+    variant = LOG.replace("worker 7 ", "worker 7b ")
+    packed = _pack_history(_history(LOG, variant).entries)
+    packed[1]["delta"] = packed[1]["delta"][1:]
+    assert [e["text"] for e in unpack_history(packed)] == [LOG]
+
+
+def test_bad_base_index_is_dropped():
+    packed = _pack_history(_history(LOG, LOG.replace("worker 7 ", "worker 7b ")).entries)
+    packed[1]["base"] = 5
+    assert [e["text"] for e in unpack_history(packed)] == [LOG]
+
+
+def test_delta_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(storage, "_DELTA_CACHE_BYTES", 1000)
+    storage._delta_cache.clear()
+    monkeypatch.setattr(storage, "_delta_cache_bytes", 0)
+    for n in range(20):
+        _pack_history(_history(LOG, LOG + f"tail {n} " * 40 + "\n").entries)
+    assert storage._delta_cache_bytes <= 1000
+    assert sum(size for _ops, size in storage._delta_cache.values()) == storage._delta_cache_bytes
+
+
+def test_missing_time_does_not_date_entries_today(tmp_path, monkeypatch):
+    path = tmp_path / "history.json"
+    path.write_text(
+        json.dumps(
+            [
+                {"time": "2024-01-01 09:00:00", "text": "first"},
+                {"text": "no time"},
+                {"time": "2024-01-02 09:00:00", "text": "third"},
+                {"time": "2024-01-03 09:00:00", "text": "fourth"},
+            ]
+        ),
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(storage, "history_path", lambda: path)
+    entries = storage.load_history(10)
+    assert "ts" not in entries[1]
+    h = History(max_items=10, max_bytes=1 << 30, entries=entries)
+    # The undated entry takes its predecessor's ts; nothing lands in "Today"
+    assert [e["ts"] for e in h][1] == h[0]["ts"]
+    assert h.range_indexes(*time_ranges()["Today"]) == (4, 4)
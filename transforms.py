@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from history import content_hash
+
+
+@dataclass(frozen=True)
+class Transform:
+    """One step of a chain, operating on a list of lines.
+
+    `per_line` steps only look at one line at a time, so a run of them can be
+    applied chunk by chunk instead of over the whole clip at once.
+    """
+
+    name: str
+    label: str
+    fn: Callable[[List[str]], List[str]]
+    per_line: bool = False
+
+
+def _unique(lines: List[str]) -> List[str]:
+    # Keeps the first occurrence and the original order
+    return list(dict.fromkeys(lines))
+
+
+def _drop_blank(lines: List[str]) -> List[str]:
+    return [ln for ln in lines if ln.strip()]
+
+
+TRANSFORMS: Dict[str, Transform] = {
+    t.name: t
+    for t in [
+        Transform("reverse", "Reverse lines", lambda lines: lines[::-1]),
+        Transform("sort", "Sort lines", sorted),
+        Transform("sort_ci", "Sort lines (ignore case)", lambda lines: sorted(lines, key=str.casefold)),
+        Transform("unique", "Remove duplicate lines", _unique),
+        Transform("drop_blank", "Remove blank lines", _drop_blank, per_line=True),
+        Transform("trim", "Trim lines", lambda lines: [ln.strip() for ln in lines], per_line=True),
+        Transform("join", "Join lines", lambda lines: [" ".join(ln.strip() for ln in lines if ln.strip())]),
+        Transform("upper", "UPPER CASE", lambda lines: [ln.upper() for ln in lines], per_line=True),
+        Transform("lower", "lower case", lambda lines: [ln.lower() for ln in lines], per_line=True),
+        Transform("title", "Title Case", lambda lines: [ln.title() for ln in lines], per_line=True),
+    ]
+}
+
+# Named chains offered in the UI and to hotkeys. "reverse_lines" is the classic Reverse button.
+PRESETS: Dict[str, Tuple[str, ...]] = {
+    "reverse_lines": ("reverse",),
+    "sort": ("sort",),
+    "sort_unique": ("trim", "drop_blank", "sort", "unique"),
+    "unique": ("unique",),
+    "trim": ("trim",),
+    "join": ("join",),
+    "upper": ("upper",),
+    "lower": ("lower",),
+    "title": ("title",),
+}
+
+PRESET_LABELS: Dict[str, str] = {
+    "reverse_lines": "Reverse lines",
+    "sort": "Sort lines",
+    "sort_unique": "Sort + unique (trimmed)",
+    "unique": "Remove duplicate lines",
+    "trim": "Trim lines",
+    "join": "Join lines",
+    "upper": "UPPER CASE",
+    "lower": "lower case",
+    "title": "Title Case",
+}
+
+
+class TransformCancelled(Exception):
+    pass
+
+
+def _chunks(lines: List[str], size: int) -> Iterator[List[str]]:
+    for i in range(0, len(lines), size):
+        yield lines[i : i + size]
+
+
+def apply_chain(
+    text: str,
+    chain: Sequence[str],
+    chunk_lines: int = 4096,
+    cancelled: Optional[Callable[[], bool]] = None,
+) -> str:
+    """Run the named transforms over `text` and return the result.
+
+    Consecutive per-line steps are fused and run over `chunk_lines` lines at a
+    time; `cancelled` is checked between chunks and steps. Raises KeyError for
+    an unknown step and TransformCancelled if cancelled.
+    """
+    steps = [TRANSFORMS[name] for name in chain]
+    lines = text.splitlines()
+
+    i = 0
+    while i < len(steps):
+        if cancelled and cancelled():
+            raise TransformCancelled()
+        if not steps[i].per_line:
+            lines = steps[i].fn(lines)
+            i += 1
+            continue
+
+        run = []
+        while i < len(steps) and steps[i].per_line:
+            run.append(steps[i])
+            i += 1
+        out: List[str] = []
+        for chunk in _chunks(lines, chunk_lines):
+            if cancelled and cancelled():
+                raise TransformCancelled()
+            for step in run:
+                chunk = step.fn(chunk)
+            out.extend(chunk)
+        lines = out
+
+    return "\n".join(lines)
+
+
+@dataclass
+class TransformEngine:
+    """Runs chains off the UI thread and caches results per (clip, chain).
+
+    The cache is keyed on the clip's content hash (the history entry's "hash"
+    when the caller has one), so it never keeps a clip alive after the history
+    has evicted it; only outputs are held, up to `max_cached_bytes` characters.
+    `schedule` marshals callbacks back to the UI thread (e.g. Tk's after(0, ...)).
+    """
+
+    schedule: Callable[[Callable[[], None]], None]
+    max_cached: int = 32
+    max_cached_bytes: int = 16 * 1024 * 1024
+    # Clips smaller than this are transformed inline; a thread would cost more than it saves.
+    async_threshold: int = 256 * 1024
+    _cache: "OrderedDict[Tuple[str, Tuple[str, ...]], str]" = field(default_factory=OrderedDict)
+    _cached_bytes: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+    _generation: int = 0
+
+    def cached(self, digest: str, chain: Sequence[str]) -> Optional[str]:
+        key = (digest, tuple(chain))
+        with self._lock:
+            out = self._cache.get(key)
+            if out is not None:
+                self._cache.move_to_end(key)
+            return out
+
+    def _store(self, digest: str, chain: Tuple[str, ...], out: str) -> None:
+        if len(out) > self.max_cached_bytes:
+            return
+        key = (digest, chain)
+        with self._lock:
+            old = self._cache.pop(key, None)
+            if old is not None:
+                self._cached_bytes -= len(old)
+            self._cache[key] = out
+            self._cached_bytes += len(out)
+            while len(self._cache) > self.max_cached or self._cached_bytes > self.max_cached_bytes:
+                _key, dropped = self._cache.popitem(last=False)
+                self._cached_bytes -= len(dropped)
+
+    def run(
+        self,
+        text: str,
+        chain: Sequence[str],
+        on_done: Callable[[str], None],
+        on_error: Optional[Callable[[str], None]] = None,
+        digest: Optional[str] = None,
+    ) -> bool:
+        """Transform `text` and call on_done(result) on the UI thread.
+
+        `digest` is the text's content hash if the caller already has it.
+        Returns True if the result was delivered immediately (cache hit or small
+        clip). A newer call supersedes any transform still running.
+        """
+        chain = tuple(chain)
+        self._generation += 1
+        gen = self._generation
+        digest = digest or content_hash(text)
+
+        hit = self.cached(digest, chain)
+        if hit is not None:
+            on_done(hit)
+            return True
+
+        if len(text) < self.async_threshold:
+            try:
+                out = apply_chain(text, chain)
+            except KeyError as e:
+                if on_error:
+                    on_error(f"Unknown transform: {e}")
+                return True
+            self._store(digest, chain, out)
+            on_done(out)
+            return True
+
+        def stale() -> bool:
+            return gen != self._generation
+
+        def work() -> None:
+            try:
+                out = apply_chain(text, chain, cancelled=stale)
+            except TransformCancelled:
+                return
+            except Exception as e:
+                if on_error:
+                    msg = f"Transform failed: {e}"
+                    self.schedule(lambda: on_error(msg))
+                return
+            self._store(digest, chain, out)
+            if not stale():
+                self.schedule(lambda: on_done(out))
+
+        threading.Thread(target=work, name="copy2-transform", daemon=True).start()
+        return False